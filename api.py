@@ -5,10 +5,117 @@ Author: Mike Marzigliano
 """
 import time
 import json
+import codecs
+import asyncio
+import functools
 import hmac
 import base64
 import hashlib
+import os
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from requests.adapters import HTTPAdapter
+from ratelimit import RateLimiter, PRIORITY_ORDER, PRIORITY_DEFAULT
+from cache import TTLCache
+from latency import LatencyTracker
+from endpoints import ENDPOINTS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# the fastest installed decoder, both take bytes or str
+json_loads = orjson.loads if orjson is not None else json.loads
+
+
+def json_dumps(obj):
+    """Return obj as compact JSON bytes, with orjson if it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+
+def iter_json_array(res, chunk_size=65536):
+    """
+    Yield the elements of a JSON array response as the body streams in.
+
+    Only the undecoded tail of the body is buffered, so rows can be used
+    before the last byte arrives and the whole body is never held as one
+    string. The response should be requested with stream=True.
+
+    Arguments:
+    res -- a requests.Response whose body is a JSON array
+    chunk_size -- bytes to read at a time (default 65536)
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder('utf-8')()
+    chunks = res.iter_content(chunk_size=chunk_size)
+    buf = ''
+    pos = 0
+    started = False
+    # after '[' an element or ']', after ',' an element, after an element
+    # exactly one ',' or ']'
+    expect_delimiter = False
+    first = True
+    eof = False
+
+    while True:
+        while pos < len(buf) and buf[pos].isspace():
+            pos += 1
+
+        if pos < len(buf):
+            if not started:
+                if buf[pos] != '[':
+                    raise ValueError('response is not a JSON array')
+                pos += 1
+                started = True
+                continue
+
+            if expect_delimiter:
+                if buf[pos] == ']':
+                    return
+                if buf[pos] != ',':
+                    raise ValueError('expected , or ] in JSON array')
+                pos += 1
+                expect_delimiter = False
+                continue
+
+            if buf[pos] == ']':
+                if first:
+                    return
+                raise ValueError('trailing , in JSON array')
+            if buf[pos] == ',':
+                raise ValueError('missing element in JSON array')
+
+            # an element may be cut short at the end of the buffer, e.g. a
+            # number, so it is only taken once a delimiter follows it
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+                if eof or (end < len(buf) and
+                           (buf[end] in ',]' or buf[end].isspace())):
+                    yield obj
+                    pos = end
+                    expect_delimiter = True
+                    first = False
+                    continue
+            except ValueError:
+                if eof:
+                    raise
+
+        if eof:
+            raise ValueError('truncated JSON array')
+
+        chunk = next(chunks, None)
+        buf = buf[pos:]
+        pos = 0
+        if chunk is None:
+            buf += text.decode(b'', final=True)
+            eof = True
+        else:
+            buf += text.decode(chunk)
 
 
 class Geminipy(object):
@@ -17,6 +124,8 @@ class Geminipy(object):
 
     Make public or authenticated requests according to the API documentation:
     https://docs.gemini.com/
+
+    The endpoint methods are generated from endpoints.ENDPOINTS.
     """
 
     live_url = 'https://api.gemini.com'
@@ -24,8 +133,36 @@ class Geminipy(object):
     base_url = sandbox_url
     api_key = ''
     secret_key = ''
-
-    def __init__(self, api_key='', secret_key='', live=False):
+    pool_size = 10
+    timeout = (3.05, 10)
+    order_timeout = (1.5, 3)
+
+    # latency budgets of quotes and order status checks, a stalled one
+    # fails fast instead of holding up the console
+    quote_timeout = (1.5, 2)
+    status_timeout = (1.5, 3)
+
+    # hedge idempotent public reads: one still unanswered at this percentile
+    # of the endpoint's recent latencies is sent again, first response wins
+    hedge = False
+    hedge_percentile = 95
+
+    # exchange limits are 120 public and 600 private requests per minute
+    public_rate = 2
+    public_burst = 5
+    private_rate = 10
+    private_burst = 20
+    max_throttled_retries = 3
+    json_loads = staticmethod(json_loads)
+
+    # seconds a balances or active orders response is reused; 0 only shares
+    # a request already in flight
+    private_read_window = 0
+
+    def __init__(self, api_key='', secret_key='', live=False, pool_size=None,
+                 timeout=None, order_timeout=None, nonce=None,
+                 json_loads=None, private_read_window=None,
+                 quote_timeout=None, status_timeout=None, hedge=None):
         """
         Initialize the class.
 
@@ -33,297 +170,423 @@ class Geminipy(object):
         api_key -- your Gemini API key
         secret_key -- your Gemini API secret key for signatures
         live -- use the live API? otherwise, use the sandbox (default False)
+        pool_size -- max keep-alive connections to hold open (default 10)
+        timeout -- (connect, read) timeout in seconds (default (3.05, 10))
+        order_timeout -- (connect, read) timeout for order entry, kept short
+                         as new orders are retried safely (default (1.5, 3))
+        nonce -- a Nonce to sign private requests with (default None)
+        json_loads -- a function decoding response bodies, e.g. ujson.loads
+                      (default orjson.loads if installed, else json.loads)
+        private_read_window -- seconds to reuse a balances or active orders
+                               response, reset by order entry (default 0)
+        quote_timeout -- (connect, read) timeout for the ticker and order
+                         book (default (1.5, 2))
+        status_timeout -- (connect, read) timeout for order status and
+                          active orders (default (1.5, 3))
+        hedge -- send a duplicate of a slow ticker, order book, symbols or
+                 auction request and take the first response (default False)
         """
         self.api_key = api_key
         self.secret_key = secret_key
+        self.nonce = nonce
+
+        if nonce is None:
+            self.nonce = Nonce()
 
         if live:
             self.base_url = self.live_url
 
-    # public requests
-    def symbols(self):
-        """Send a request for all trading symbols, return the response."""
-        url = self.base_url + '/v1/symbols'
+        if pool_size is not None:
+            self.pool_size = pool_size
 
-        return requests.get(url)
+        if timeout is not None:
+            self.timeout = timeout
 
-    def pubticker(self, symbol='btcusd'):
-        """Send a request for latest ticker info, return the response."""
-        url = self.base_url + '/v1/pubticker/' + symbol
+        if order_timeout is not None:
+            self.order_timeout = order_timeout
 
-        return requests.get(url)
+        if json_loads is not None:
+            self.json_loads = json_loads
 
-    def book(self, symbol='btcusd', limit_bids=0, limit_asks=0):
-        """
-        Send a request to get the public order book, return the response.
+        if private_read_window is not None:
+            self.private_read_window = private_read_window
 
-        Arguments:
-        symbol -- currency symbol (default 'btcusd')
-        limit_bids -- limit the number of bids returned (default 0)
-        limit_asks -- limit the number of asks returned (default 0)
-        """
-        url = self.base_url + '/v1/book/' + symbol
-        params = {
-            'limit_bids': limit_bids,
-            'limit_asks': limit_asks
-        }
+        if quote_timeout is not None:
+            self.quote_timeout = quote_timeout
+
+        if status_timeout is not None:
+            self.status_timeout = status_timeout
 
-        return requests.get(url, params)
+        if hedge is not None:
+            self.hedge = hedge
 
-    def trades(self, symbol='btcusd', since=0, limit_trades=50,
-               include_breaks=0):
+        self.signer = Signer(self.api_key, self.secret_key)
+        self.session = self.new_session()
+        self.public_limiter = RateLimiter(self.public_rate, self.public_burst)
+        self.private_limiter = RateLimiter(self.private_rate,
+                                           self.private_burst)
+
+        # identical concurrent reads share one request and its response
+        self.public_reads = TTLCache(ttl=0)
+        self.private_reads = TTLCache(ttl=self.private_read_window)
+
+        self.latency = LatencyTracker()
+        self.hedge_executor = ThreadPoolExecutor(max_workers=2 * self.pool_size)
+
+    def new_session(self):
         """
-        Send a request to get all public trades, return the response.
+        Return a keep-alive session shared by all public and private requests.
 
-        Arguments:
-        symbol -- currency symbol (default 'btcusd')
-        since -- only return trades after this unix timestamp (default 0)
-        limit_trades -- maximum number of trades to return (default 50).
-        include_breaks -- whether to display broken trades (default False)
+        Connections to the API host are pooled, so back to back requests reuse
+        a warm TLS socket instead of paying a fresh handshake each time.
         """
-        url = self.base_url + '/v1/trades/' + symbol
-        params = {
-            'since': since,
-            'limit_trades': limit_trades,
-            'include_breaks': include_breaks
-        }
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({'Accept-Encoding': 'gzip, deflate',
+                                'Connection': 'keep-alive'})
+
+        return session
+
+    def close(self):
+        """Close the session and all pooled connections."""
+        self.hedge_executor.shutdown(wait=False)
+        self.session.close()
+
+    def _call(self, endpoint, args):
+        """Send the request of an endpoint for its bound method arguments."""
+        path = endpoint.get_path(args)
+        params = endpoint.get_params(args)
+        stream = args.get('stream', False)
+
+        timeout = None
+        if endpoint.timeout is not None:
+            timeout = getattr(self, endpoint.timeout)
+
+        if not endpoint.private:
+            return self._get(self.base_url + path, params or None,
+                             priority=endpoint.priority, stream=stream,
+                             timeout=timeout, name=endpoint.name,
+                             hedge=endpoint.hedge)
+
+        if endpoint.read:
+            return self._read(path, params, timeout=timeout,
+                              name=endpoint.name)
+
+        return self._post(path, params, priority=endpoint.priority,
+                          timeout=timeout, stream=stream, name=endpoint.name)
+
+    def _get(self, url, params=None, priority=PRIORITY_DEFAULT, stream=False,
+             timeout=None, name=None, hedge=False):
+        """Send a rate limited public GET request on the pooled session."""
+        if timeout is None:
+            timeout = self.timeout
+
+        def attempt():
+            return self.session.get(url, params=params, timeout=timeout,
+                                    stream=stream)
+
+        def send():
+            if hedge and self.hedge and not stream:
+                return self._hedged(name, attempt)
+
+            return self._timed(name, attempt)
+
+        def load():
+            return self._throttled(self.public_limiter, priority, send)
+
+        # a streamed body can only be read once, so it is never shared
+        if stream:
+            return load()
+
+        key = (url, tuple(sorted((params or {}).items())))
+        return self.public_reads.get(key, load)
+
+    def _post(self, request, params, priority=PRIORITY_DEFAULT, timeout=None,
+              stream=False, name=None):
+        """Sign and send a rate limited private POST request."""
+        url = self.base_url + request
+        if timeout is None:
+            timeout = self.timeout
 
-        return requests.get(url, params)
+        # the nonce is taken after the limiter lets the request through, so
+        # a queued request jumped by a higher priority one still signs with
+        # a higher nonce than anything already sent
+        def attempt():
+            payload = {'request': request, 'nonce': self.get_nonce()}
+            payload.update(params)
 
-    def auction(self, symbol='btcusd'):
-        """Send a request for latest auction info, return the response."""
-        url = self.base_url + '/v1/auction/' + symbol
+            return self.session.post(url, headers=self.prepare(payload),
+                                     timeout=timeout, stream=stream)
 
-        return requests.get(url)
+        def send():
+            return self._timed(name, attempt)
 
-    def auction_history(self, symbol='btcusd', since=0,
-                        limit_auction_results=50, include_indicative=1):
+        res = self._throttled(self.private_limiter, priority, send)
+
+        # order entry and cancels change balances and active orders
+        if priority == PRIORITY_ORDER:
+            self.private_reads.invalidate()
+
+        return res
+
+    def _read(self, request, params, timeout=None, name=None):
+        """Send a private read, sharing a response in flight or in the window."""
+        def load():
+            return self._post(request, params, timeout=timeout, name=name)
+
+        # an error, e.g. a rejected nonce, is not reused for the window
+        return self.private_reads.get(request, load,
+                                  keep=lambda res: res.status_code == 200)
+
+    def _timed(self, name, send):
+        """Send, record the latency of an answered request to endpoint name."""
+        start = time.monotonic()
+        res = send()
+
+        if name is not None and res.status_code != 429:
+            self.latency.add(name, time.monotonic() - start)
+
+        return res
+
+    def _hedged(self, name, send):
         """
-        Send a request for auction history info, return the response.
+        Send, and send a duplicate if the first request is slow to answer.
 
-        Arguments:
-        symbol -- currency symbol (default 'btcusd')
-        since -- only return auction events after this timestamp (default 0)
-        limit_auction_results -- maximum number of auction events to return
-                                 (default 50).
-        include_indicative -- whether to include publication of indicative
-                              prices and quantities. (default True)
+        The duplicate goes out once the first request has been waiting longer
+        than the hedge percentile of the endpoint's recent latencies, and only
+        on a token the public limiter has to spare, so a request answering in
+        time or a busy limiter sends nothing extra. The first response to
+        arrive is returned and the other is closed when it lands.
         """
-        url = self.base_url + '/v1/auction/' + symbol + '/history'
-        params = {
-            'since': since,
-            'limit_auction_results': limit_auction_results,
-            'include_indicative': include_indicative
-        }
-
-        return requests.get(url, params)
-
-    # authenticated requests
-    def new_order(self, amount, price, side, client_order_id=None,
-                  symbol='btcusd', type='exchange limit', options=None):
+        delay = self.latency.percentile(name, self.hedge_percentile)
+        if delay is None:
+            return self._timed(name, send)
+
+        first = self.hedge_executor.submit(self._timed, name, send)
+        done, pending = wait([first], timeout=delay)
+        if done or not self.public_limiter.try_acquire():
+            return first.result()
+
+        second = self.hedge_executor.submit(self._timed, name, send)
+        pending = set([first, second])
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self.latency.hedged(name, future is second)
+                    for other in pending:
+                        other.add_done_callback(close_response)
+
+                    return future.result()
+
+        # both failed, raise the error of the first
+        self.latency.hedged(name, False)
+        return first.result()
+
+    def _throttled(self, limiter, priority, send):
+        """Send once a token is free, queue again on HTTP 429."""
+        for attempt in range(self.max_throttled_retries + 1):
+            limiter.acquire(priority)
+            res = send()
+            if res.status_code != 429:
+                break
+
+            retry_after = res.headers.get('Retry-After', '1')
+            limiter.penalize(float(retry_after) if retry_after.isdigit() else 1)
+
+        # res.json() decodes with the configured decoder
+        res.json = functools.partial(self.decode, res)
+
+        return res
+
+    def decode(self, res, **kwargs):
+        """Return the decoded JSON body of a response."""
+        return self.json_loads(res.content)
+
+    def get_nonce(self):
+        """Return the next strictly increasing millisecond nonce."""
+        return self.nonce.next()
+
+    def prepare(self, params):
         """
-        Send a request to place an order, return the response.
+        Prepare, return the required HTTP headers.
 
         Arguments:
-        amount -- quoted decimal amount of BTC to purchase
-        price -- quoted decimal amount of USD to spend per BTC
-        side -- 'buy' or 'sell'
-        client_order_id -- an optional client-specified order id (default None)
-        symbol -- currency symbol (default 'btcusd')
-        type -- the order type (default 'exchange limit')
+        params -- a dictionary of parameters
         """
-        request = '/v1/order/new'
-        url = self.base_url + request
-        params = {
-            'request': request,
-            'nonce': self.get_nonce(),
-            'symbol': symbol,
-            'amount': amount,
-            'price': price,
-            'side': side,
-            'type': type
-        }
+        return self.signer.sign(params)
 
-        if client_order_id is not None:
-            params['client_order_id'] = client_order_id
 
-        if options is not None:
-            params['options'] = options
+def close_response(future):
+    """Close the response of a finished request nobody is waiting for."""
+    if future.exception() is None:
+        future.result().close()
 
-        return requests.post(url, headers=self.prepare(params))
 
-    def cancel_order(self, order_id):
+class Signer(object):
+    """
+    Sign private request payloads with a pre-keyed HMAC.
+
+    The HMAC is keyed once, so each request copies its state rather than
+    hashing the secret key again, and the payload is compact JSON, so there
+    are fewer bytes to base 64 encode, hash and send.
+    """
+
+    def __init__(self, api_key, secret_key):
         """
-        Send a request to cancel an order, return the response.
+        Initialize the class.
 
         Arguments:
-        order_id - the order id to cancel
+        api_key -- your Gemini API key
+        secret_key -- your Gemini API secret key for signatures
         """
-        request = '/v1/order/cancel'
-        url = self.base_url + request
-        params = {
-            'request': request,
-            'nonce': self.get_nonce(),
-            'order_id': order_id
-        }
+        self.api_key = api_key
+        self.mac = hmac.new(secret_key.encode(), digestmod=hashlib.sha384)
 
-        return requests.post(url, headers=self.prepare(params))
+    def sign(self, params):
+        """
+        Base 64 encode the parameters, sign it with the secret key,
+        return the HTTP headers.
 
-    def cancel_session(self):
-        """Send a request to cancel all session orders, return the response."""
-        request = '/v1/order/cancel/session'
-        url = self.base_url + request
-        params = {
-            'request': request,
-            'nonce': self.get_nonce()
-        }
+        Arguments:
+        params -- a dictionary of parameters
+        """
+        payload = base64.b64encode(json_dumps(params))
+        mac = self.mac.copy()
+        mac.update(payload)
+
+        return {'X-GEMINI-APIKEY': self.api_key,
+                'X-GEMINI-PAYLOAD': payload,
+                'X-GEMINI-SIGNATURE': mac.hexdigest()}
 
-        return requests.post(url, headers=self.prepare(params))
 
-    def cancel_all(self):
-        """Send a request to cancel all orders, return the response."""
-        request = '/v1/order/cancel/all'
-        url = self.base_url + request
-        params = {
-            'request': request,
-            'nonce': self.get_nonce()
-        }
+class Nonce(object):
+    """
+    A thread-safe, strictly increasing nonce source for private requests.
 
-        return requests.post(url, headers=self.prepare(params))
+    Nonces track the millisecond clock, but two requests in the same
+    millisecond or a clock stepping backwards still get a higher nonce than
+    the last one issued. With a path, a high-water mark is persisted so a
+    restarted process resumes above every nonce it has already used.
+    """
+
+    reserve = 10000
 
-    def order_status(self, order_id):
+    def __init__(self, path=None):
         """
-        Send a request to get an order status, return the response.
+        Initialize the class.
 
         Arguments:
-        order_id -- the order id to get information on
+        path -- an optional file to persist the high-water mark (default None)
         """
-        request = '/v1/order/status'
-        url = self.base_url + request
-        params = {
-            'request': request,
-            'nonce': self.get_nonce(),
-            'order_id': order_id
-        }
+        self.path = path
+        self.lock = threading.Lock()
+        self.last = 0
+        self.reserved = 0
+
+        if path is not None:
+            self.last = self.load()
+
+    def next(self):
+        """Return a nonce higher than any previously issued one."""
+        with self.lock:
+            nonce = max(int(time.time() * 1000), self.last + 1)
+            self.last = nonce
+
+            # persist a reservation ahead of the nonce rather than every
+            # nonce, so only one in every few thousand requests writes a file
+            if self.path is not None and nonce >= self.reserved:
+                self.reserved = nonce + self.reserve
+                self.save(self.reserved)
+
+            return nonce
+
+    def load(self):
+        """Return the persisted high-water mark, or 0 if there is none."""
+        try:
+            with open(self.path) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def save(self, value):
+        """Atomically persist the high-water mark."""
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write(str(value))
+
+        os.replace(tmp, self.path)
+
+
+class AsyncGeminipy(object):
+    """
+    An asyncio version of Geminipy with the same endpoint surface.
 
-        return requests.post(url, headers=self.prepare(params))
+    Each request runs the blocking Geminipy call on a thread pool sized to the
+    connection pool, so independent requests can be awaited concurrently while
+    sharing one set of keep-alive connections. The responses are the same
+    requests.Response objects Geminipy returns.
 
-    def active_orders(self):
-        """Send a request to get active orders, return the response."""
-        request = '/v1/orders'
-        url = self.base_url + request
-        params = {
-            'request': request,
-            'nonce': self.get_nonce()
-        }
-
-        return requests.post(url, headers=self.prepare(params))
+    Nonces are unique across threads, but concurrent private requests can
+    reach the exchange out of nonce order and be rejected with InvalidNonce.
+    The gemini module sends every private request through send_private,
+    which resends a rejected one, so any API key can be used.
+    """
 
-    def past_trades(self, symbol='btcusd', limit_trades=50, timestamp=0):
+    def __init__(self, con, executor=None):
         """
-        Send a trade history request, return the response.
+        Initialize the class.
 
-        Arguements:
-        symbol -- currency symbol (default 'btcusd')
-        limit_trades -- maximum number of trades to return (default 50)
-        timestamp -- only return trades after this unix timestamp (default 0)
+        Arguments:
+        con -- the Geminipy instance to send requests with
+        executor -- an optional executor to run requests on (default None)
         """
-        request = '/v1/mytrades'
-        url = self.base_url + request
-        params = {
-            'request': request,
-            'nonce': self.get_nonce(),
-            'symbol': symbol,
-            'limit_trades': limit_trades,
-            'timestamp': timestamp
-        }
-
-        return requests.post(url, headers=self.prepare(params))
-
-    def tradevolume(self):
-        """Send a request to get your trade volume, return the response."""
-        request = '/v1/tradevolume'
-        url = self.base_url + request
-        params = {
-            'request': request,
-            'nonce': self.get_nonce()
-        }
+        self.con = con
+        self.executor = executor
 
-        return requests.post(url, headers=self.prepare(params))
+        if executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=con.pool_size)
 
-    def balances(self):
-        """Send an account balance request, return the response."""
-        request = '/v1/balances'
-        url = self.base_url + request
-        params = {
-            'request': request,
-            'nonce': self.get_nonce()
-        }
+    async def run(self, fn, *args, **kwargs):
+        """Run a blocking call on the executor, return its result."""
+        loop = asyncio.get_running_loop()
 
-        return requests.post(url, headers=self.prepare(params))
+        return await loop.run_in_executor(
+            self.executor, functools.partial(fn, *args, **kwargs))
 
-    def newAddress(self, currency='btc', label=''):
-        """
-        Send a request for a new cryptocurrency deposit address
-        with an optional label. Return the response.
+    def close(self):
+        """Shut down the executor, the Geminipy session is left open."""
+        self.executor.shutdown(wait=False)
 
-        Arguements:
-        currency -- a Gemini supported cryptocurrency (btc, eth)
-        label -- optional label for the deposit address
-        """
-        request = '/v1/deposit/' + currency + '/newAddress'
-        url = self.base_url + request
-        params = {
-            'request': request,
-            'nonce': self.get_nonce()
-        }
-
-        if label != '':
-            params['label'] = label
 
-        return requests.post(url, headers=self.prepare(params))
-
-    def fees(self):
-        """Send a request to get fee and notional volume, return the response."""
-        request = '/v1/notionalvolume'
-        url = self.base_url + request
-        params = {
-            'request': request,
-            'nonce': self.get_nonce()
-        }
+def endpoint_method(endpoint):
+    """Return a Geminipy method sending the request of an endpoint."""
+    def method(self, *args, **kwargs):
+        return self._call(endpoint, endpoint.bind(args, kwargs))
 
-        return requests.post(url, headers=self.prepare(params))
+    method.__name__ = endpoint.name
+    method.__qualname__ = 'Geminipy.' + endpoint.name
+    method.__doc__ = endpoint.doc
+    method.__signature__ = endpoint.signature()
 
-    def heartbeat(self):
-        """Send a heartbeat message, return the response."""
-        request = '/v1/heartbeat'
-        url = self.base_url + request
-        params = {
-            'request': request,
-            'nonce': self.get_nonce()
-        }
+    return method
 
-        return requests.post(url, headers=self.prepare(params))
 
-    def get_nonce(self):
-        """Return the current millisecond timestamp as the nonce."""
-        return int(round(time.time() * 1000))
+def async_endpoint_method(endpoint):
+    """Return an AsyncGeminipy method running the Geminipy one."""
+    async def method(self, *args, **kwargs):
+        return await self.run(getattr(self.con, endpoint.name), *args, **kwargs)
 
-    def prepare(self, params):
-        """
-        Prepare, return the required HTTP headers.
+    method.__name__ = endpoint.name
+    method.__qualname__ = 'AsyncGeminipy.' + endpoint.name
+    method.__doc__ = endpoint.doc
+    method.__signature__ = endpoint.signature()
 
-        Base 64 encode the parameters, sign it with the secret key,
-        create the HTTP headers, return the whole payload.
+    return method
 
-        Arguments:
-        params -- a dictionary of parameters
-        """
-        jsonparams = json.dumps(params)
-        payload = base64.b64encode(jsonparams.encode())
-        signature = hmac.new(self.secret_key.encode(), payload,
-                             hashlib.sha384).hexdigest()
 
-        return {'X-GEMINI-APIKEY': self.api_key,
-                'X-GEMINI-PAYLOAD': payload,
-                'X-GEMINI-SIGNATURE': signature}
+for endpoint in ENDPOINTS:
+    setattr(Geminipy, endpoint.name, endpoint_method(endpoint))
+    setattr(AsyncGeminipy, endpoint.name, async_endpoint_method(endpoint))
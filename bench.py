@@ -0,0 +1,84 @@
+"""
+This module benchmarks the signing cost of a private request.
+
+Run with `make bench` or `python3 bench.py [requests]`.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import sys
+import timeit
+from api import Geminipy, Signer
+
+API_KEY = 'account-bench'
+SECRET_KEY = 'bench-secret-key-0123456789abcdef'
+
+ORDER = {
+    'request': '/v1/order/new',
+    'nonce': 1500000000000,
+    'symbol': 'btcusd',
+    'amount': '0.12345678',
+    'price': '9012.34',
+    'side': 'buy',
+    'type': 'exchange limit',
+    'client_order_id': '0d4f0c0e-5b1f-4b7e-9d1a-3c3e5e8f6a7b',
+    'options': ['maker-or-cancel'],
+}
+
+
+def sign_unkeyed(params):
+    """Sign the way every request was signed before the Signer."""
+    payload = base64.b64encode(json.dumps(params).encode())
+    signature = hmac.new(SECRET_KEY.encode(), payload,
+                         hashlib.sha384).hexdigest()
+
+    return {'X-GEMINI-APIKEY': API_KEY,
+            'X-GEMINI-PAYLOAD': payload,
+            'X-GEMINI-SIGNATURE': signature}
+
+
+class Payloads(object):
+    """A Geminipy sending nothing, to time building and signing a request."""
+
+    def __init__(self):
+        self.con = Geminipy(API_KEY, SECRET_KEY)
+        self.con._post = self.post
+
+    def post(self, request, params, priority=None, timeout=None, stream=False,
+             name=None):
+        payload = {'request': request, 'nonce': 1500000000000}
+        payload.update(params)
+
+        return self.con.prepare(payload)
+
+
+def per_request(fn, n):
+    """Return the best microseconds per call over a few runs of n calls."""
+    return min(timeit.repeat(fn, number=n, repeat=5)) / n * 1e6
+
+
+def main(n=20000):
+    signer = Signer(API_KEY, SECRET_KEY)
+    payloads = Payloads()
+
+    rows = [
+        ('unkeyed hmac, default json', lambda: sign_unkeyed(ORDER)),
+        ('pre-keyed hmac, compact json', lambda: signer.sign(ORDER)),
+        ('new_order call, signed', lambda: payloads.con.new_order(
+            '0.12345678', '9012.34', 'buy',
+            client_order_id=ORDER['client_order_id'],
+            options=ORDER['options'])),
+    ]
+
+    base = None
+    print('{0:<32}{1:>12}{2:>10}'.format('', 'us/request', 'speedup'))
+    for name, fn in rows:
+        us = per_request(fn, n)
+        if base is None:
+            base = us
+        print('{0:<32}{1:>12.2f}{2:>9.2f}x'.format(name, us, base / us))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
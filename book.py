@@ -0,0 +1,121 @@
+"""
+This module contains an in-memory L2 order book.
+"""
+from bisect import bisect_left, bisect_right, insort
+
+SIDE_BID = "bid"
+SIDE_ASK = "ask"
+
+
+class OrderBook(object):
+    """
+    Price levels kept sorted for best price, depth and VWAP queries.
+
+    Each side is a dict of price to amount plus a sorted list of its prices.
+    Updating an existing level is a dict write. Adding or removing a level is
+    a binary search plus one list insert or delete, which is a memmove rather
+    than a rebuild. Queries walk outward from the best price, so they cost
+    only the levels they cover.
+    """
+
+    def __init__(self):
+        self.bids = {}
+        self.asks = {}
+        self.bid_prices = []
+        self.ask_prices = []
+
+    def load(self, snapshot):
+        """
+        Replace the book with a /v1/book snapshot.
+
+        Arguments:
+        snapshot -- a dict with 'bids' and 'asks' lists of price levels
+        """
+        self.bids = dict((float(l["price"]), float(l["amount"]))
+                         for l in snapshot["bids"])
+        self.asks = dict((float(l["price"]), float(l["amount"]))
+                         for l in snapshot["asks"])
+        self.bid_prices = sorted(self.bids)
+        self.ask_prices = sorted(self.asks)
+
+        return self
+
+    def copy(self):
+        """Return an independent copy of the book."""
+        book = OrderBook()
+        book.bids = dict(self.bids)
+        book.asks = dict(self.asks)
+        book.bid_prices = list(self.bid_prices)
+        book.ask_prices = list(self.ask_prices)
+
+        return book
+
+    def update(self, side, price, amount):
+        """
+        Set the amount resting at a price level, removing it at zero.
+
+        Arguments:
+        side -- SIDE_BID or SIDE_ASK
+        price -- the level price
+        amount -- the total amount now resting at the level
+        """
+        if side == SIDE_BID:
+            levels, prices = self.bids, self.bid_prices
+        else:
+            levels, prices = self.asks, self.ask_prices
+
+        if amount > 0:
+            if price not in levels:
+                insort(prices, price)
+            levels[price] = amount
+        elif price in levels:
+            del levels[price]
+            del prices[bisect_left(prices, price)]
+
+    def best_bid(self):
+        """Return the highest bid price, or None."""
+        return self.bid_prices[-1] if self.bid_prices else None
+
+    def best_ask(self):
+        """Return the lowest ask price, or None."""
+        return self.ask_prices[0] if self.ask_prices else None
+
+    def walk(self, side):
+        """Yield (price, amount) levels of a side from the best price out."""
+        if side == SIDE_BID:
+            for price in reversed(self.bid_prices):
+                yield price, self.bids[price]
+        else:
+            for price in self.ask_prices:
+                yield price, self.asks[price]
+
+    def depth(self, side, price):
+        """Return the amount resting at price or better on a side."""
+        if side == SIDE_BID:
+            prices = self.bid_prices[bisect_left(self.bid_prices, price):]
+            return sum(self.bids[p] for p in prices)
+
+        prices = self.ask_prices[:bisect_right(self.ask_prices, price)]
+        return sum(self.asks[p] for p in prices)
+
+    def vwap(self, side, size):
+        """
+        Return the average price and amount filled taking size from a side.
+
+        Arguments:
+        side -- the side to take liquidity from, SIDE_ASK to buy
+        size -- the amount to fill
+        """
+        filled = 0.0
+        cost = 0.0
+        for price, amount in self.walk(side):
+            take = min(amount, size - filled)
+            filled += take
+            cost += take * price
+            if filled >= size:
+                break
+
+        if filled == 0:
+            return None, 0.0
+
+        return cost / filled, filled
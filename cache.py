@@ -0,0 +1,133 @@
+"""
+This module contains a thread-safe TTL cache with single-flight loading.
+"""
+import time
+import threading
+
+
+class TTLCache(object):
+    """
+    A thread-safe cache of values loaded on demand.
+
+    Each lookup passes the staleness it can tolerate, so strict and relaxed
+    callers can share one cache. Concurrent misses on the same key wait for a
+    single load to finish instead of each starting their own.
+
+    A cache with a ttl of 0 keeps no values at all and only shares loads
+    that are in flight, so it coalesces identical concurrent requests.
+    """
+
+    def __init__(self, ttl=0):
+        """
+        Initialize the class.
+
+        Arguments:
+        ttl -- default max age in seconds of a cached value (default 0)
+        """
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.flights = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, load, max_age=None, keep=None):
+        """
+        Return the cached value for key, loading it if it is too stale.
+
+        Arguments:
+        key -- the cache key
+        load -- a function returning a fresh value
+        max_age -- max age in seconds to accept (default the cache ttl)
+        keep -- a function saying whether a loaded value may be stored
+                (default None, store every value)
+        """
+        if max_age is None:
+            max_age = self.ttl
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= max_age:
+                self.hits += 1
+                return entry[1]
+
+            flight = self.flights.get(key)
+            owner = flight is None
+            if owner:
+                flight = Flight()
+                self.flights[key] = flight
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if not owner:
+            return flight.wait()
+
+        started = time.monotonic()
+        try:
+            value = load()
+        except Exception as ex:
+            flight.error = ex
+            raise
+        else:
+            flight.value = value
+            with self.lock:
+                # a load invalidated while in flight may predate the change
+                if (self.ttl > 0 and not flight.detached and
+                        (keep is None or keep(value))):
+                    self.entries[key] = (started, value)
+        finally:
+            with self.lock:
+                if self.flights.get(key) is flight:
+                    del self.flights[key]
+            flight.done.set()
+
+        return value
+
+    def put(self, key, value):
+        """Store a value fetched elsewhere as fresh."""
+        with self.lock:
+            self.entries[key] = (time.monotonic(), value)
+
+    def invalidate(self, key=None):
+        """
+        Drop the cached value for key, or every value if key is None.
+
+        Loads already in flight are detached, so later callers start a fresh
+        load instead of joining one that began before the invalidation, and
+        the detached load's value is not stored.
+        """
+        with self.lock:
+            if key is None:
+                self.entries.clear()
+                flights = list(self.flights.values())
+                self.flights.clear()
+            else:
+                self.entries.pop(key, None)
+                flights = [self.flights.pop(key)] if key in self.flights else []
+
+            for flight in flights:
+                flight.detached = True
+
+    def stats(self):
+        """Return the hit and miss counters."""
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+class Flight(object):
+    """A load in progress that other callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.detached = False
+
+    def wait(self):
+        """Wait for the load, return its value or raise its error."""
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+
+        return self.value
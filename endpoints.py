@@ -0,0 +1,319 @@
+"""
+This module contains the table of Gemini API endpoints.
+
+Each endpoint is declared once with its path, parameters, rate limit
+priority and docstring. The api module generates the Geminipy and
+AsyncGeminipy methods from this table, so they share one request path.
+"""
+import inspect
+from ratelimit import PRIORITY_ORDER, PRIORITY_DEFAULT, PRIORITY_BULK
+
+# a parameter without a default must be passed by the caller
+REQUIRED = inspect.Parameter.empty
+
+# a parameter that is always sent
+ALWAYS = object()
+
+
+class Param(object):
+    """A method argument sent as a request parameter."""
+
+    def __init__(self, name, default=REQUIRED, omit=ALWAYS):
+        """
+        Initialize the class.
+
+        Arguments:
+        name -- the argument and parameter name
+        default -- the argument default (default REQUIRED)
+        omit -- leave the parameter out when the argument is this value
+                (default ALWAYS)
+        """
+        self.name = name
+        self.default = default
+        self.omit = omit
+
+
+class Endpoint(object):
+    """
+    An API endpoint and the method that calls it.
+
+    Path arguments such as {symbol} are formatted into the path, the other
+    arguments are sent as query parameters of a public GET or in the signed
+    payload of a private POST.
+    """
+
+    def __init__(self, name, path, params=(), private=False,
+                 priority=PRIORITY_DEFAULT, read=False, stream=False,
+                 timeout=None, hedge=False, doc=None):
+        """
+        Initialize the class.
+
+        Arguments:
+        name -- the generated method name
+        path -- the request path, e.g. '/v1/book/{symbol}'
+        params -- the method arguments in order, a list of Param
+        private -- sign and POST the request? otherwise GET it (default False)
+        priority -- the rate limit priority (default PRIORITY_DEFAULT)
+        read -- share the response with identical private reads
+                (default False)
+        stream -- add a stream argument deferring the body (default False)
+        timeout -- the Geminipy attribute holding the request timeout
+                   (default None, the session timeout)
+        hedge -- the request is an idempotent public read Geminipy may send
+                 twice when the first is slow (default False)
+        doc -- the method docstring
+        """
+        self.name = name
+        self.path = path
+        self.params = list(params)
+        self.private = private
+        self.priority = priority
+        self.read = read
+        self.stream = stream
+        self.timeout = timeout
+        self.hedge = hedge
+        self.doc = doc
+
+        self.path_args = [p.name for p in self.params
+                          if '{' + p.name + '}' in path]
+        self.sent = [p for p in self.params if p.name not in self.path_args]
+
+        self.names = [p.name for p in self.params]
+        if stream:
+            self.names.append('stream')
+
+        self.defaults = dict((p.name, p.default) for p in self.params
+                             if p.default is not REQUIRED)
+        if stream:
+            self.defaults['stream'] = False
+
+    def bind(self, args, kwargs):
+        """
+        Return the method arguments by name, defaults filled in.
+
+        This is Signature.bind() for the plain arguments an endpoint takes,
+        at a fraction of the cost on the request path.
+        """
+        if len(args) > len(self.names):
+            raise TypeError('{0}() takes {1} arguments but {2} were given'
+                            .format(self.name, len(self.names), len(args)))
+
+        bound = dict(self.defaults)
+        bound.update(zip(self.names, args))
+
+        for name in kwargs:
+            if name not in self.names:
+                raise TypeError('{0}() got an unexpected keyword argument {1!r}'
+                                .format(self.name, name))
+            if name in self.names[:len(args)]:
+                raise TypeError('{0}() got multiple values for argument {1!r}'
+                                .format(self.name, name))
+
+        bound.update(kwargs)
+
+        if len(bound) < len(self.names):
+            missing = [name for name in self.names if name not in bound]
+            raise TypeError('{0}() missing required arguments: {1}'
+                            .format(self.name, ', '.join(missing)))
+
+        return bound
+
+    def signature(self):
+        """Return the signature of the generated method."""
+        args = [inspect.Parameter('self', inspect.Parameter.POSITIONAL_OR_KEYWORD)]
+        args.extend(inspect.Parameter(p.name,
+                                      inspect.Parameter.POSITIONAL_OR_KEYWORD,
+                                      default=p.default)
+                    for p in self.params)
+
+        if self.stream:
+            args.append(inspect.Parameter('stream',
+                                          inspect.Parameter.POSITIONAL_OR_KEYWORD,
+                                          default=False))
+
+        return inspect.Signature(args)
+
+    def get_path(self, args):
+        """Return the request path for the bound method arguments."""
+        if not self.path_args:
+            return self.path
+
+        return self.path.format(**dict((name, args[name])
+                                       for name in self.path_args))
+
+    def get_params(self, args):
+        """Return the request parameters for the bound method arguments."""
+        params = {}
+        for p in self.sent:
+            value = args[p.name]
+            if p.omit is ALWAYS or value != p.omit:
+                params[p.name] = value
+
+        return params
+
+
+ENDPOINTS = [
+    # public requests
+    Endpoint('symbols', '/v1/symbols', hedge=True,
+             doc="""Send a request for all trading symbols, return the response."""),
+
+    Endpoint('pubticker', '/v1/pubticker/{symbol}',
+             params=[Param('symbol', 'btcusd')],
+             timeout='quote_timeout', hedge=True,
+             doc="""Send a request for latest ticker info, return the response."""),
+
+    Endpoint('book', '/v1/book/{symbol}',
+             params=[Param('symbol', 'btcusd'),
+                     Param('limit_bids', 0),
+                     Param('limit_asks', 0)],
+             timeout='quote_timeout', hedge=True,
+             doc="""
+        Send a request to get the public order book, return the response.
+
+        Arguments:
+        symbol -- currency symbol (default 'btcusd')
+        limit_bids -- limit the number of bids returned (default 0)
+        limit_asks -- limit the number of asks returned (default 0)
+        """),
+
+    Endpoint('trades', '/v1/trades/{symbol}',
+             params=[Param('symbol', 'btcusd'),
+                     Param('since', 0),
+                     Param('limit_trades', 50),
+                     Param('include_breaks', 0)],
+             priority=PRIORITY_BULK, stream=True,
+             doc="""
+        Send a request to get all public trades, return the response.
+
+        Arguments:
+        symbol -- currency symbol (default 'btcusd')
+        since -- only return trades after this unix timestamp (default 0)
+        limit_trades -- maximum number of trades to return (default 50).
+        include_breaks -- whether to display broken trades (default False)
+        stream -- defer the body for iter_json_array (default False)
+        """),
+
+    Endpoint('auction', '/v1/auction/{symbol}',
+             params=[Param('symbol', 'btcusd')],
+             hedge=True,
+             doc="""Send a request for latest auction info, return the response."""),
+
+    Endpoint('auction_history', '/v1/auction/{symbol}/history',
+             params=[Param('symbol', 'btcusd'),
+                     Param('since', 0),
+                     Param('limit_auction_results', 50),
+                     Param('include_indicative', 1)],
+             priority=PRIORITY_BULK,
+             doc="""
+        Send a request for auction history info, return the response.
+
+        Arguments:
+        symbol -- currency symbol (default 'btcusd')
+        since -- only return auction events after this timestamp (default 0)
+        limit_auction_results -- maximum number of auction events to return
+                                 (default 50).
+        include_indicative -- whether to include publication of indicative
+                              prices and quantities. (default True)
+        """),
+
+    # authenticated requests
+    Endpoint('new_order', '/v1/order/new',
+             params=[Param('amount'),
+                     Param('price'),
+                     Param('side'),
+                     Param('client_order_id', None, omit=None),
+                     Param('symbol', 'btcusd'),
+                     Param('type', 'exchange limit'),
+                     Param('options', None, omit=None)],
+             private=True, priority=PRIORITY_ORDER, timeout='order_timeout',
+             doc="""
+        Send a request to place an order, return the response.
+
+        Arguments:
+        amount -- quoted decimal amount of BTC to purchase
+        price -- quoted decimal amount of USD to spend per BTC
+        side -- 'buy' or 'sell'
+        client_order_id -- an optional client-specified order id (default None)
+        symbol -- currency symbol (default 'btcusd')
+        type -- the order type (default 'exchange limit')
+        options -- a list of order execution options (default None)
+        """),
+
+    Endpoint('cancel_order', '/v1/order/cancel',
+             params=[Param('order_id')],
+             private=True, priority=PRIORITY_ORDER,
+             doc="""
+        Send a request to cancel an order, return the response.
+
+        Arguments:
+        order_id - the order id to cancel
+        """),
+
+    Endpoint('cancel_session', '/v1/order/cancel/session',
+             private=True, priority=PRIORITY_ORDER,
+             doc="""Send a request to cancel all session orders, return the response."""),
+
+    Endpoint('cancel_all', '/v1/order/cancel/all',
+             private=True, priority=PRIORITY_ORDER,
+             doc="""Send a request to cancel all orders, return the response."""),
+
+    Endpoint('order_status', '/v1/order/status',
+             params=[Param('order_id', None, omit=None),
+                     Param('client_order_id', None, omit=None)],
+             private=True, timeout='status_timeout',
+             doc="""
+        Send a request to get an order status, return the response.
+
+        Arguments:
+        order_id -- the order id to get information on (default None)
+        client_order_id -- or the client-specified order id (default None)
+        """),
+
+    Endpoint('active_orders', '/v1/orders',
+             private=True, read=True, timeout='status_timeout',
+             doc="""Send a request to get active orders, return the response."""),
+
+    Endpoint('past_trades', '/v1/mytrades',
+             params=[Param('symbol', 'btcusd'),
+                     Param('limit_trades', 50),
+                     Param('timestamp', 0)],
+             private=True, priority=PRIORITY_BULK, stream=True,
+             doc="""
+        Send a trade history request, return the response.
+
+        Arguements:
+        symbol -- currency symbol (default 'btcusd')
+        limit_trades -- maximum number of trades to return (default 50)
+        timestamp -- only return trades after this unix timestamp (default 0)
+        stream -- defer the body for iter_json_array (default False)
+        """),
+
+    Endpoint('tradevolume', '/v1/tradevolume',
+             private=True,
+             doc="""Send a request to get your trade volume, return the response."""),
+
+    Endpoint('balances', '/v1/balances',
+             private=True, read=True,
+             doc="""Send an account balance request, return the response."""),
+
+    Endpoint('newAddress', '/v1/deposit/{currency}/newAddress',
+             params=[Param('currency', 'btc'),
+                     Param('label', '', omit='')],
+             private=True,
+             doc="""
+        Send a request for a new cryptocurrency deposit address
+        with an optional label. Return the response.
+
+        Arguements:
+        currency -- a Gemini supported cryptocurrency (btc, eth)
+        label -- optional label for the deposit address
+        """),
+
+    Endpoint('fees', '/v1/notionalvolume',
+             private=True,
+             doc="""Send a request to get fee and notional volume, return the response."""),
+
+    Endpoint('heartbeat', '/v1/heartbeat',
+             private=True,
+             doc="""Send a heartbeat message, return the response."""),
+]
@@ -3,6 +3,6 @@ class ApiError(Exception):
         self.res = res
         self.code = res.status_code
         self.json = res.json()
-        super().__init__({"code": res.status_code, "json": res.json()})
+        super().__init__({"code": res.status_code, "json": self.json})
 
 
@@ -0,0 +1,378 @@
+"""
+This module contains a scheduler working a large order as smaller child orders.
+
+Amounts are satoshis and prices micro-dollars, see the money module.
+"""
+import json
+import os
+import time
+import gemini
+import money
+from error import ApiError
+
+MODE_TWAP = "twap"
+MODE_ICEBERG = "iceberg"
+
+MODES = [MODE_TWAP, MODE_ICEBERG]
+
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_STOPPED = "stopped"
+STATUS_FAILED = "failed"
+
+# children in a row the exchange may cancel unfilled, e.g. maker-or-cancel
+# at a crossing price, before the schedule gives up
+MAX_UNFILLED_CHILDREN = 3
+
+
+def new_twap(con, side, price, quantity, slices, duration,
+             maker_or_cancel=False, reserve_api_fees=gemini.RESERVE_FEE_ACTUAL,
+             path=None, clock=time.time):
+    """
+    Return a schedule sending quantity BTC in slices over duration seconds.
+
+    Arguments:
+    con -- a Geminipy connection
+    side -- gemini.SIDE_BUY or gemini.SIDE_SELL
+    price -- the limit price of every child order
+    quantity -- the total BTC amount
+    slices -- the number of child orders
+    duration -- seconds from the first child to the last
+    maker_or_cancel -- send children as maker-or-cancel (default False)
+    reserve_api_fees -- the fee reserve of each child (default actual)
+    path -- a file to save the state to (default None)
+    clock -- a function returning the time in seconds (default time.time)
+    """
+    if int(slices) < 1:
+        raise Exception("Invalid slice count: {0}".format(slices))
+
+    state = new_state(MODE_TWAP, side, price, quantity, maker_or_cancel,
+                      reserve_api_fees)
+    state["slices"] = int(slices)
+    state["duration"] = float(duration)
+
+    return Schedule(con, state, path=path, clock=clock)
+
+
+def new_iceberg(con, side, price, quantity, visible,
+                maker_or_cancel=False, reserve_api_fees=gemini.RESERVE_FEE_ACTUAL,
+                path=None, clock=time.time):
+    """
+    Return a schedule showing at most visible BTC of quantity at a time.
+
+    Arguments:
+    con -- a Geminipy connection
+    side -- gemini.SIDE_BUY or gemini.SIDE_SELL
+    price -- the limit price of every child order
+    quantity -- the total BTC amount
+    visible -- the max BTC amount of each child order
+    maker_or_cancel -- send children as maker-or-cancel (default False)
+    reserve_api_fees -- the fee reserve of each child (default actual)
+    path -- a file to save the state to (default None)
+    clock -- a function returning the time in seconds (default time.time)
+    """
+    if not money.to_sats(visible) > 0:
+        raise Exception("Invalid visible size: {0}".format(visible))
+
+    state = new_state(MODE_ICEBERG, side, price, quantity, maker_or_cancel,
+                      reserve_api_fees)
+    state["visible"] = money.to_sats(visible)
+
+    return Schedule(con, state, path=path, clock=clock)
+
+
+def load_schedule(con, path, clock=time.time):
+    """Return the schedule saved at path, or None if there is none."""
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    return Schedule(con, state, path=path, clock=clock)
+
+
+def new_state(mode, side, price, quantity, maker_or_cancel, reserve_api_fees):
+    if side not in [gemini.SIDE_BUY, gemini.SIDE_SELL]:
+        raise Exception("Invalid side: {0}".format(side))
+
+    if not money.to_micros(price) > 0:
+        raise Exception("Invalid price: {0}".format(price))
+
+    if not money.to_sats(quantity) > 0:
+        raise Exception("Invalid quantity: {0}".format(quantity))
+
+    return {
+        "mode": mode,
+        "side": side,
+        "price": money.to_micros(price),
+        "quantity": money.to_sats(quantity),
+        "slices": 1,
+        "duration": 0.0,
+        "visible": None,
+        "maker_or_cancel": maker_or_cancel,
+        "reserve_api_fees": reserve_api_fees,
+        "start": None,
+        "next_slice": 0,
+        "children": [],
+        "unfilled": 0,
+        "status": STATUS_RUNNING,
+    }
+
+
+class Schedule(object):
+    """
+    A parent order worked as a sequence of child limit orders.
+
+    TWAP sends one child per time slice. When a slice is due, the unfilled
+    rest of the previous child is cancelled and what is left of the parent is
+    spread over the slices still to come. Iceberg keeps one child of at most
+    the visible size on the book and sends the next one when it is done.
+    Fills are read from each child's OrderStatus.
+
+    The state is plain JSON saved after every step, so a schedule interrupted
+    by a restart resumes from its file. A child is saved with its
+    client_order_id before it is sent, so one sent just before a crash is
+    found again on resume instead of being sent twice. Time comes from an
+    injected clock, so a schedule can be stepped against a simulated exchange
+    and clock.
+
+    A child the exchange cancels without a fill is sent again, but after
+    MAX_UNFILLED_CHILDREN in a row the schedule stops as failed.
+    """
+
+    def __init__(self, con, state, path=None, clock=time.time):
+        """
+        Initialize the class.
+
+        Arguments:
+        con -- a Geminipy connection
+        state -- the schedule state, from new_state() or a saved file
+        path -- a file to save the state to after every step (default None)
+        clock -- a function returning the time in seconds (default time.time)
+        """
+        if state["mode"] not in MODES:
+            raise Exception("Mode {0} not in {1}".format(state["mode"], MODES))
+
+        self.con = con
+        self.state = state
+        self.path = path
+        self.clock = clock
+        self.live = None
+
+        self.resolve_pending()
+
+        # a resumed schedule picks its live child back up by order id
+        for child in state["children"]:
+            if child["live"] and self.live is None:
+                self.live = gemini.get_order_status(con, child["order_id"])
+
+    def step(self):
+        """Refresh the live child, send the next one if due, return True while running."""
+        state = self.state
+        if state["status"] != STATUS_RUNNING:
+            return False
+
+        if state["start"] is None:
+            state["start"] = self.clock()
+
+        self.resolve_pending()
+        self.refresh()
+
+        remaining = self.get_remaining()
+        if remaining <= 0:
+            self.finish(STATUS_DONE)
+            return False
+
+        if state.get("unfilled", 0) >= MAX_UNFILLED_CHILDREN:
+            self.finish(STATUS_FAILED)
+            return False
+
+        if state["mode"] == MODE_TWAP:
+            if (state["next_slice"] < state["slices"] and
+                    self.clock() >= self.get_slice_due(state["next_slice"])):
+                self.cancel_live()
+                remaining = self.get_remaining()
+
+                left = state["slices"] - state["next_slice"]
+                state["next_slice"] += 1
+                if remaining > 0:
+                    self.send(remaining // left or remaining)
+
+            # after the last slice, resend whatever an early cancel left over
+            elif state["next_slice"] == state["slices"] and self.live is None:
+                self.send(remaining)
+
+        elif self.live is None:
+            self.send(min(state["visible"], remaining))
+
+        self.save()
+        return True
+
+    def run(self, interval=1.0, sleep=time.sleep, on_step=None):
+        """
+        Step until the schedule is done or stopped.
+
+        Arguments:
+        interval -- seconds between steps (default 1.0)
+        sleep -- a function sleeping for seconds (default time.sleep)
+        on_step -- an optional function called with the schedule after each step
+        """
+        while self.step():
+            if on_step is not None:
+                on_step(self)
+            sleep(interval)
+
+        if on_step is not None:
+            on_step(self)
+
+    def stop(self):
+        """Cancel the live child and stop the schedule."""
+        self.refresh()
+        self.cancel_live()
+        self.finish(STATUS_STOPPED)
+
+    def refresh(self):
+        if self.live is None:
+            return
+
+        self.live.refresh()
+        self.record(self.live)
+
+    def cancel_live(self):
+        if self.live is None:
+            return
+
+        # the child may fill before the cancel lands
+        try:
+            self.live.cancel()
+        except ApiError:
+            self.live.refresh()
+
+        self.record(self.live, cancelled=True)
+        self.live = None
+
+    def send(self, amount):
+        state = self.state
+
+        o = gemini.new_order(self.con, state["side"],
+                             money.micros_to_usd(state["price"]),
+                             money.sats_to_btc(amount), gemini.UNIT_BTC)
+        o.set_maker_or_cancel(state["maker_or_cancel"])
+        o.set_reserve_api_fees(state["reserve_api_fees"])
+        o.prepare()
+
+        # saved as pending first, a crash after the order goes out leaves
+        # the client_order_id to find it by
+        child = {"order_id": None,
+                 "client_order_id": gemini.new_client_order_id(),
+                 "amount": amount, "executed": 0, "avg_price": 0,
+                 "live": True}
+        state["children"].append(child)
+        self.save()
+
+        o.execute(client_order_id=child["client_order_id"])
+
+        status = o.get_status()
+        child["order_id"] = status.get_order_id()
+        self.live = status
+        self.record(status)
+
+    def resolve_pending(self):
+        # a child saved but never confirmed is looked up by client_order_id;
+        # if the exchange never took it, it is dropped
+        pending = [c for c in self.state["children"] if c["order_id"] is None]
+        for child in pending:
+            data = gemini.find_order(self.con, child["client_order_id"],
+                                     retries=gemini.ORDER_RETRIES)
+            if data is None:
+                self.state["children"].remove(child)
+                continue
+
+            status = gemini.OrderStatus(self.con, data)
+            child["order_id"] = status.get_order_id()
+            if status.is_live():
+                self.live = status
+            self.record(status)
+
+        if pending:
+            self.save()
+
+    def record(self, status, cancelled=False):
+        # the child entry keeps the exact executed amount and average price
+        for child in self.state["children"]:
+            if child["order_id"] == status.get_order_id():
+                child["executed"] = money.to_sats(status.get_executed_amount())
+                child["avg_price"] = money.to_micros(status.get_avg_execution_price())
+                child["live"] = status.is_live()
+
+        if status.is_live():
+            return
+
+        self.live = None
+
+        # a child the exchange cancelled with no fill counts towards giving up
+        if not cancelled:
+            if money.to_sats(status.get_executed_amount()) == 0:
+                self.state["unfilled"] = self.state.get("unfilled", 0) + 1
+            else:
+                self.state["unfilled"] = 0
+
+    def finish(self, status):
+        self.state["status"] = status
+        self.save()
+
+    def save(self):
+        """Atomically persist the state, if the schedule has a path."""
+        if self.path is None:
+            return
+
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f)
+
+        os.replace(tmp, self.path)
+
+    def get_slice_due(self, n):
+        """Return the time slice n is due."""
+        state = self.state
+        return state["start"] + state["duration"] * n / state["slices"]
+
+    def get_executed(self):
+        """Return the satoshis filled across all children."""
+        return sum(c["executed"] for c in self.state["children"])
+
+    def get_remaining(self):
+        """Return the satoshis still to fill."""
+        return self.state["quantity"] - self.get_executed()
+
+    def get_status(self):
+        return self.state["status"]
+
+    def progress(self):
+        """Return a dict summarizing the schedule for display."""
+        state = self.state
+        executed = self.get_executed()
+        value = sum(money.usd_value(c["avg_price"], c["executed"])
+                    for c in state["children"])
+
+        next_due = None
+        if state["mode"] == MODE_TWAP and state["start"] is not None:
+            if state["next_slice"] < state["slices"]:
+                next_due = self.get_slice_due(state["next_slice"])
+
+        return {
+            "mode": state["mode"],
+            "side": state["side"],
+            "price": money.micros_to_usd(state["price"]),
+            "quantity": money.sats_to_btc(state["quantity"]),
+            "executed": money.sats_to_btc(executed),
+            "remaining": money.sats_to_btc(self.get_remaining()),
+            "pct": executed * 100 / state["quantity"],
+            "avg_price": money.micros_to_usd(money.div_round(value * money.SATS, executed)) if executed else 0.0,
+            "children": len(state["children"]),
+            "live_order_id": self.live.get_order_id() if self.live is not None else None,
+            "next_slice": state["next_slice"] if state["mode"] == MODE_TWAP else None,
+            "next_due": next_due,
+            "status": state["status"],
+        }
@@ -1,7 +1,17 @@
-from api import Geminipy
-from decimal import Decimal
+from api import Geminipy, iter_json_array
+import asyncio
+import random
+import time
+import uuid
+import requests
+import money
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from error import ApiError
+from cache import TTLCache
+from store import TradeStore
+from book import OrderBook, SIDE_BID, SIDE_ASK
+from records import Trade, Balance, Quote
 import util
 
 SIDE_BUY = "buy"
@@ -18,6 +28,46 @@ MAX_API_MAKER_FEE =  0.0010
 MAX_API_TAKER_FEE =  0.0035
 MAX_API_TAKER_FEE_DELTA =  MAX_API_TAKER_FEE - MAX_API_MAKER_FEE
 
+# max quote staleness in seconds: strict for order entry, relaxed for P&L views
+QUOTE_MAX_AGE_FRESH = 0
+QUOTE_MAX_AGE_STRICT = 1.0
+QUOTE_MAX_AGE_RELAXED = 10.0
+
+quote_cache = TTLCache(ttl=QUOTE_MAX_AGE_STRICT)
+
+# streaming market data feeds by API host and symbol
+market_feeds = {}
+
+# order entry retries transient failures, and every private request a
+# rejected nonce, waiting up to ORDER_BACKOFF * 2^n
+ORDER_RETRIES = 3
+ORDER_BACKOFF = 0.25
+TRANSIENT_STATUS_CODES = [500, 502, 503, 504]
+
+# an auto-cancelled maker-or-cancel order is repriced and resubmitted up to
+# CHASE_ATTEMPTS times within CHASE_TIME_BUDGET seconds
+CHASE_ATTEMPTS = 5
+CHASE_TIME_BUDGET = 10.0
+
+# concurrent ladder submissions and cancels; the private rate limiter paces them
+LADDER_WORKERS = 8
+CANCEL_WORKERS = 8
+
+# fetches fees and the quote while a replace is waiting on its cancel
+prefetch_executor = ThreadPoolExecutor(max_workers=2)
+
+# max trades per /v1/mytrades request
+MYTRADES_PAGE_SIZE = 500
+
+# local trade history stores by API host and key
+trade_stores = {}
+
+# the fee tier only moves with 30 day volume, so refresh it on our own fills
+# or after this many seconds
+FEE_MAX_AGE = 300
+
+fee_cache = TTLCache(ttl=FEE_MAX_AGE)
+
 def new_order(con, side, price, quantity, unit):
     return Order(con, side=side, price=price, quantity=quantity, quantity_unit=unit)
 
@@ -26,29 +76,70 @@ def get_order(con, order_id):
     return Order(con, side=status.get_side(), price=status.get_price(), quantity=status.get_original_amount(), quantity_unit=UNIT_BTC, status=status)
 
 def get_order_status(con, order_id):
-    res = con.order_status(order_id)
+    res = send_private(con.order_status, order_id)
     if res.status_code != 200:
         raise ApiError(res)
 
     return OrderStatus(con, res.json())
 
-def get_quote(con):
-    res = con.pubticker(symbol="btcusd")
+def get_quote(con, max_age=QUOTE_MAX_AGE_STRICT):
+    # a live market data feed is always current, so it serves every max_age
+    feed = market_feeds.get((con.base_url, SYMBOL_BTCUSD))
+    if feed is not None:
+        quote = feed.get_quote()
+        if quote is not None:
+            return quote
+
+    def load():
+        res = con.pubticker(symbol=SYMBOL_BTCUSD)
+        return parse_quote(res)
+
+    return quote_cache.get((con.base_url, SYMBOL_BTCUSD), load, max_age=max_age)
+
+async def get_quote_async(acon, max_age=QUOTE_MAX_AGE_STRICT):
+    return await acon.run(get_quote, acon.con, max_age=max_age)
+
+def attach_market_data(con, feed):
+    # quotes are read from the feed while it is live, and from the REST
+    # ticker otherwise; the ticker seeds the last price until a trade prints
+    market_feeds[(con.base_url, feed.symbol)] = feed
+    bid, ask, spread, last = get_quote(con, max_age=QUOTE_MAX_AGE_FRESH)
+    feed.set_last(last)
+
+def parse_quote(res):
     if res.status_code != 200:
         raise ApiError(res)
 
     tick = res.json()
-    ask = float(tick["ask"])
-    bid = float(tick["bid"])
-    last = float(tick["last"])
-    spread = ask - bid
+    return Quote(float(tick["bid"]), float(tick["ask"]), float(tick["last"]))
+
+def get_order_book(con, limit=0):
+    # the streamed book when a feed is live, otherwise a /v1/book snapshot
+    feed = market_feeds.get((con.base_url, SYMBOL_BTCUSD))
+    if feed is not None:
+        book = feed.get_book()
+        if book is not None:
+            return book
 
-    return bid, ask, spread, last
+    res = con.book(symbol=SYMBOL_BTCUSD, limit_bids=limit, limit_asks=limit)
+    return OrderBook().load(parse_json(res))
 
-def get_fees(con):
+def get_fees(con, max_age=None):
     # note first monnth of API usage shows 0% maker fees, but limit orders must reserve the
     # normal fee amount so they can be executed after the first month with fees reserved
-    res = con.fees()
+    def load():
+        res = send_private(con.fees)
+        return parse_fees(res)
+
+    return fee_cache.get((con.base_url, con.api_key), load, max_age=max_age)
+
+async def get_fees_async(acon, max_age=None):
+    return await acon.run(get_fees, acon.con, max_age=max_age)
+
+def invalidate_fees(con):
+    fee_cache.invalidate((con.base_url, con.api_key))
+
+def parse_fees(res):
     if res.status_code != 200:
         raise ApiError(res)
     else:
@@ -63,46 +154,319 @@ def get_fees(con):
         return api_maker_fee, api_taker_fee, web_maker_fee, web_taker_fee
 
 def get_balances(con):
-    bid, ask, spread, last = get_quote(con)
+    bid, ask, spread, last = get_quote(con, max_age=QUOTE_MAX_AGE_RELAXED)
+
+    res = send_private(con.balances)
+    return parse_balances(res, last)
+
+async def get_balances_async(acon):
+    quote, res = await asyncio.gather(
+        get_quote_async(acon, max_age=QUOTE_MAX_AGE_RELAXED),
+        acon.run(send_private, acon.con.balances))
+    bid, ask, spread, last = quote
 
-    res = con.balances()
+    return parse_balances(res, last)
+
+def parse_balances(res, last):
     if res.status_code != 200:
         raise ApiError(res)
-    else:
-        headers = ["currency", "amount", "available"]
-        balances = res.json()
-
-        account_value = 0.0
-        available_to_trade_usd = 0.0
-        available_to_trade_btc = 0.0
-        l = []
-        for b in balances:
-            currency = b["currency"]
-            amount = float(b["amount"])
-            available = float(b["available"])
-            if currency == "USD":
-                account_value += amount
-                available_to_trade_usd = available
-            elif currency == "BTC":
-                account_value += amount * last
-                available_to_trade_btc = available
-            else:
-                continue
 
-            item = []
-            for h in headers:
-                item.append(b[h])
-            l.append(item)
+    account_value = 0.0
+    available_to_trade_usd = 0.0
+    available_to_trade_btc = 0.0
+    for b in map(Balance, res.json()):
+        if b.currency == "USD":
+            account_value += b.amount
+            available_to_trade_usd = b.available
+        elif b.currency == "BTC":
+            account_value += b.amount * last
+            available_to_trade_btc = b.available
 
-        return account_value, available_to_trade_usd, available_to_trade_btc
+    return account_value, available_to_trade_usd, available_to_trade_btc
 
 def get_active_orders(con):
-    res = con.active_orders()
+    res = send_private(con.active_orders)
+    return parse_orders(con, res)
+
+async def get_active_orders_async(acon):
+    res = await acon.run(send_private, acon.con.active_orders)
+    return parse_orders(acon.con, res)
+
+def parse_orders(con, res):
+    return [OrderStatus(con, data) for data in parse_json(res)]
+
+def get_past_trades(con, symbol=SYMBOL_BTCUSD):
+    # full history, newest first like a single /v1/mytrades page
+    trades = list(iter_trades(con, symbol=symbol))
+    trades.reverse()
+    return trades
+
+def iter_trades(con, symbol=SYMBOL_BTCUSD):
+    # full history oldest first as Trade records, from the local trade store
+    # when one is open
+    store = trade_stores.get((con.base_url, con.api_key))
+    if store is None:
+        return map(Trade, iter_past_trades(con, symbol=symbol))
+
+    sync_trades(con, store, symbol=symbol)
+    return map(Trade, store.get_trades(symbol))
+
+def sync_trades(con, store, symbol=SYMBOL_BTCUSD):
+    # the store does not need trades in order, so rows go in as they stream
+    since = store.get_high_water_mark(symbol)
+    return store.sync(iter_past_trades(con, symbol=symbol, since=since, ordered=False), symbol)
+
+def open_trade_store(con, path):
+    store = TradeStore(path)
+    trade_stores[(con.base_url, con.api_key)] = store
+    return store
+
+async def get_past_trades_async(acon, symbol=SYMBOL_BTCUSD):
+    return await acon.run(get_past_trades, acon.con, symbol=symbol)
+
+def iter_past_trades(con, symbol=SYMBOL_BTCUSD, since=0, page_size=MYTRADES_PAGE_SIZE, ordered=True):
+    # page forward through /v1/mytrades from since (ms) and yield trades oldest
+    # first as each page arrives; a timestamp of 0 returns the newest page, so
+    # the cursor starts at 1. unordered, trades are yielded newest first
+    # within each page while its body is still streaming in
+    cursor = max(int(since), 1)
+    seen = set()
+
+    while True:
+        res = send_private(con.past_trades, symbol=symbol, limit_trades=page_size, timestamp=cursor, stream=True)
+        if res.status_code != 200:
+            raise ApiError(res)
+
+        page = iter_json_array(res)
+        if ordered:
+            page = reversed(list(page))
+
+        # the cursor is inclusive, so trades at the boundary ms come back again
+        count = 0
+        new = 0
+        last = 0
+        boundary = []
+        for t in page:
+            count += 1
+            if t["timestampms"] > last:
+                last = t["timestampms"]
+                boundary = []
+            if t["timestampms"] == last:
+                boundary.append(t["tid"])
+
+            if t["tid"] not in seen:
+                new += 1
+                yield t
+
+        if count < page_size:
+            return
+
+        # a full page of trades in one ms stops the cursor, and the rest of
+        # that ms cannot be reached
+        if new == 0:
+            raise Exception("{0} or more trades at {1} ms, trade history is incomplete.".format(page_size, cursor))
+
+        if last != cursor:
+            cursor = last
+            seen = set()
+
+        seen.update(boundary)
+
+def parse_json(res):
     if res.status_code != 200:
         raise ApiError(res)
 
     return res.json()
 
+def new_client_order_id():
+    return uuid.uuid4().hex
+
+def submit_order(con, client_order_id, retries=ORDER_RETRIES, **order):
+    # retry transient failures with jittered backoff; a failed attempt may
+    # still have reached the exchange, so look the order up by its
+    # client_order_id before submitting it again
+    for attempt in range(retries + 1):
+        if attempt > 0:
+            time.sleep(random.uniform(0, ORDER_BACKOFF * 2 ** attempt))
+
+            # the order may or may not exist until a lookup answers, so the
+            # lookup retries its own transient failures before a resubmit
+            data = find_order(con, client_order_id, retries=retries)
+            if data is not None:
+                return data
+
+        last = attempt == retries
+        try:
+            res = con.new_order(client_order_id=client_order_id, **order)
+        except (requests.ConnectionError, requests.Timeout):
+            if last:
+                raise
+            continue
+
+        # a rejected nonce never created the order, so send it again
+        if is_transient(res) and not last:
+            continue
+
+        if res.status_code != 200:
+            raise ApiError(res)
+
+        return res.json()
+
+def send_private(request, *args, **kwargs):
+    # private requests sent at once can reach the exchange out of nonce
+    # order; a rejected nonce did nothing, so send the request again
+    for attempt in range(ORDER_RETRIES + 1):
+        if attempt > 0:
+            time.sleep(random.uniform(0, ORDER_BACKOFF * 2 ** attempt))
+
+        res = request(*args, **kwargs)
+        if not is_invalid_nonce(res):
+            break
+
+    return res
+
+def is_invalid_nonce(res):
+    # concurrent requests can reach the exchange out of nonce order
+    return res.status_code == 400 and res.json().get("reason") == "InvalidNonce"
+
+def is_transient(res):
+    return res.status_code in TRANSIENT_STATUS_CODES or is_invalid_nonce(res)
+
+def find_order(con, client_order_id, retries=0):
+    # look an order up by client_order_id, None if the exchange has none;
+    # transient failures back off and look again up to retries times
+    for attempt in range(retries + 1):
+        if attempt > 0:
+            time.sleep(random.uniform(0, ORDER_BACKOFF * 2 ** attempt))
+
+        last = attempt == retries
+        try:
+            res = con.order_status(client_order_id=client_order_id)
+        except (requests.ConnectionError, requests.Timeout):
+            if last:
+                raise
+            continue
+
+        if is_transient(res) and not last:
+            continue
+
+        break
+
+    if res.status_code != 200:
+        if res.status_code == 400 and res.json().get("reason") == "OrderNotFound":
+            return None
+        raise ApiError(res)
+
+    # client order ids need not be unique, so a list may come back
+    data = res.json()
+    if isinstance(data, list):
+        return data[-1] if data else None
+
+    return data
+
+def new_ladder(con, side, low, high, rungs, quantity, unit=UNIT_BTC, maker_or_cancel=True, reserve_api_fees=RESERVE_FEE_ACTUAL):
+    # rungs evenly spaced from low to high in whole cents, the quantity split
+    # evenly with any remainder on the first rungs; every rung is prepared
+    # against one fee and quote snapshot
+    rungs = int(rungs)
+    if rungs < 1:
+        raise Exception("Invalid rung count: {0}".format(rungs))
+
+    low_cents = money.div_round(money.to_micros(low), 10000)
+    high_cents = money.div_round(money.to_micros(high), 10000)
+    if not 0 < low_cents <= high_cents:
+        raise Exception("Invalid price range: {0} - {1}".format(low, high))
+
+    if unit == UNIT_BTC:
+        total, to_float = money.to_sats(quantity), money.sats_to_btc
+    else:
+        total, to_float = money.to_micros(quantity), money.micros_to_usd
+
+    each, remainder = divmod(total, rungs)
+    if each <= 0:
+        raise Exception("Quantity {0} {1} is too small for {2} rungs".format(quantity, unit, rungs))
+
+    fees = get_fees(con) if reserve_api_fees == RESERVE_FEE_ACTUAL else None
+    quote = get_quote(con)
+
+    orders = []
+    for i in range(rungs):
+        cents = low_cents
+        if rungs > 1:
+            cents += money.div_round((high_cents - low_cents) * i, rungs - 1)
+
+        o = Order(con, side=side, price=cents / 100, quantity=to_float(each + (1 if i < remainder else 0)), quantity_unit=unit)
+        o.set_maker_or_cancel(maker_or_cancel)
+        o.set_reserve_api_fees(reserve_api_fees)
+        o.prepare(fees=fees, quote=quote)
+        orders.append(o)
+
+    return orders
+
+def execute_ladder(orders, workers=LADDER_WORKERS):
+    # submit every rung at once, each with its own retries; returns the
+    # exception per rung, None where the order was placed
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(o.execute) for o in orders]
+        return [f.exception() for f in futures]
+
+def chase_order(o, attempts=CHASE_ATTEMPTS, price_cap=None, time_budget=CHASE_TIME_BUDGET):
+    # reprice an auto-cancelled maker-or-cancel order to the best bid (buy)
+    # or ask (sell) on the freshest quote and resubmit, never past price_cap
+    # (default the order's price), until it rests or the attempts or time
+    # budget run out; returns the prices tried
+    if not o.get_maker_or_cancel():
+        raise Exception("Only maker-or-cancel orders can be chased.")
+
+    if price_cap is None:
+        price_cap = o.get_price()
+
+    deadline = time.monotonic() + time_budget
+    prices = []
+    while o.get_status().is_cancelled() and len(prices) < attempts and time.monotonic() < deadline:
+        quote = get_quote(o.con, max_age=QUOTE_MAX_AGE_FRESH)
+        bid, ask, spread, last = quote
+
+        if o.get_side() == SIDE_BUY:
+            price = min(bid, price_cap)
+        else:
+            price = max(ask, price_cap)
+
+        o.set_price(price)
+        o.prepare(quote=quote)
+        o.execute()
+        prices.append(price)
+
+    return prices
+
+def select_orders(orders, side=None, min_price=None, max_price=None, min_age=None, now=None):
+    # filter active OrderStatus records; None matches anything, min_age is
+    # seconds since the order was placed
+    if now is None:
+        now = time.time()
+
+    selected = []
+    for o in orders:
+        if side is not None and not is_side(o.get_side(), side):
+            continue
+        if min_price is not None and o.get_price() < min_price:
+            continue
+        if max_price is not None and o.get_price() > max_price:
+            continue
+        if min_age is not None and now - o.get_timestampms() / 1000 < min_age:
+            continue
+        selected.append(o)
+
+    return selected
+
+def cancel_orders(orders, workers=CANCEL_WORKERS):
+    # cancel OrderStatus records at once, with no status lookup first; each
+    # record takes its cancel response, returns the exception per order, None
+    # where the cancel went through
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(o.cancel) for o in orders]
+        return [f.exception() for f in futures]
+
 def is_side(val, side):
     if val.lower() == side:
         return True
@@ -119,16 +483,19 @@ class Order:
 
         self.maker_or_cancel = True
         self.reserve_api_fees = RESERVE_FEE_ACTUAL
+        self.client_order_id = None
+        self.timings = {}
 
         self.reset_calculated()
 
     def reset_calculated(self):
-        self.btc_amount = -1.0
-        self.subtotal = 0.0
+        # exact amounts: satoshis and micro-dollars
+        self.btc_sats = 0
+        self.subtotal_micros = 0
+        self.fee_micros = 0
+        self.total_micros = 0
         self.maker_fee = 0.0
         self.taker_fee = 0.0
-        self.fee = 0.0
-        self.total = 0.0
         self.warnings = []
 
         self.prepared = False
@@ -149,7 +516,7 @@ class Order:
     def assert_prepared(self):
         ok = (
                 self.prepared
-                and self.btc_amount > 0
+                and self.btc_sats > 0
                 )
 
         if not ok:
@@ -210,10 +577,10 @@ class Order:
         self.reset_calculated()
 
     def get_btc_amount(self):
-        return self.btc_amount
+        return money.sats_to_btc(self.btc_sats)
 
     def get_subtotal(self):
-        return self.subtotal
+        return money.micros_to_usd(self.subtotal_micros)
 
     def get_maker_fee(self):
         return self.maker_fee
@@ -222,12 +589,14 @@ class Order:
         return self.taker_fee
 
     def get_fee(self):
-        return self.fee
+        return money.micros_to_usd(self.fee_micros)
 
     def get_total(self):
-        return self.total
+        return money.micros_to_usd(self.total_micros)
 
-    def prepare(self):
+    def prepare(self, fees=None, quote=None):
+        # fees and quote may be passed in to prepare many orders against one
+        # snapshot, otherwise they are read through the caches
         self.assert_valid()
 
         # fees to use/reserve
@@ -235,7 +604,9 @@ class Order:
         api_taker_fee = 0.0
 
         if self.reserve_api_fees == RESERVE_FEE_ACTUAL:
-            api_maker_fee, api_taker_fee, web_maker_fee, web_taker_fee = get_fees(self.con)
+            if fees is None:
+                fees = get_fees(self.con)
+            api_maker_fee, api_taker_fee, web_maker_fee, web_taker_fee = fees
             api_maker_fee = api_maker_fee / 100
             api_taker_fee = api_taker_fee / 100
         elif self.reserve_api_fees == RESERVE_FEE_MAX:
@@ -247,18 +618,22 @@ class Order:
         if self.maker_or_cancel:
             fee_pct = api_maker_fee
 
+        fee_ppm = money.to_ppm(fee_pct)
+        price = money.to_micros(self.price)
+
         # btc_amount
         if self.quantity_unit == UNIT_BTC:
-            self.btc_amount = self.quantity
+            self.btc_sats = money.to_sats(self.quantity)
 
         elif self.quantity_unit == UNIT_USD:
+            quantity = money.to_micros(self.quantity)
+
+            # round down so the order never needs more than the quantity
             if self.side == SIDE_BUY:
-                self.subtotal = self.quantity / (1 + fee_pct)
-                self.btc_amount= self.subtotal / self.price
+                self.btc_sats = quantity * money.PPM * money.SATS // ((money.PPM + fee_ppm) * price)
 
             elif self.side == SIDE_SELL:
-                self.subtotal = self.quantity / (1 - fee_pct)
-                self.btc_amount = self.quantity / self.price
+                self.btc_sats = quantity * money.SATS // price
 
             else:
                 raise Exception("Invalid side: " + self.side)
@@ -266,14 +641,16 @@ class Order:
         else:
             raise Exception("Invalid quantity unit: " + self.quantity_unit)
 
-        self.subtotal = self.btc_amount * self.price
-        self.fee = self.subtotal * fee_pct
+        self.subtotal_micros = money.usd_value(price, self.btc_sats)
+        self.fee_micros = money.fee(self.subtotal_micros, fee_ppm)
         if self.side == SIDE_SELL:
-            self.fee = -self.fee
+            self.fee_micros = -self.fee_micros
 
-        self.total = self.subtotal + self.fee
+        self.total_micros = self.subtotal_micros + self.fee_micros
 
-        bid, ask, spread, last = get_quote(self.con)
+        if quote is None:
+            quote = get_quote(self.con)
+        bid, ask, spread, last = quote
 
         self.warnings = []
         if spread > 0.05:
@@ -285,12 +662,23 @@ class Order:
             if self.price < bid:
                 self.warnings.append("warning: sell price ({0}) is lower than bid ({1}) - TAKER".format(util.fmt_usd(self.price), util.fmt_usd(bid)))
 
+        # size a taker order against the streamed book, no extra round trip
+        feed = market_feeds.get((self.con.base_url, SYMBOL_BTCUSD))
+        taker = (self.side == SIDE_BUY and self.price > ask) or (self.side == SIDE_SELL and self.price < bid)
+        if feed is not None and taker:
+            depth = feed.get_depth(SIDE_ASK if self.side == SIDE_BUY else SIDE_BID, self.price)
+            btc_amount = self.get_btc_amount()
+            if depth is not None and depth < btc_amount:
+                self.warnings.append("warning: only {0} BTC available at {1} or better, {2} BTC would rest on the book".format(util.fmt_btc(depth), util.fmt_usd(self.price), util.fmt_btc(btc_amount - depth)))
+
         self.prepared = True
 
     def get_warnings(self):
         return self.warnings
 
-    def execute(self):
+    def execute(self, client_order_id=None):
+        # a fresh id per submission unless the caller recorded one to find
+        # the order by later, retries of this submission reuse it
         self.assert_valid()
         self.assert_prepared()
 
@@ -298,89 +686,182 @@ class Order:
         if self.maker_or_cancel:
             options.append(OPTION_MAKER_OR_CANCEL)
 
-        res = self.con.new_order(amount=util.fmt_btc(self.btc_amount), price=self.price, side=self.side, options=options)
+        if client_order_id is None:
+            client_order_id = new_client_order_id()
+        self.client_order_id = client_order_id
 
-        if res.status_code != 200:
-            raise ApiError(res)
+        data = submit_order(self.con, self.client_order_id, amount=money.fmt_sats(self.btc_sats), price=self.price, side=self.side, options=options)
 
-        self.status = OrderStatus(self.con, res.json())
+        self.status = OrderStatus(self.con, data)
+
+        if self.status.get_executed_amount() > 0:
+            invalidate_fees(self.con)
 
     def cancel_and_replace(self):
+        # the order is off the book from the cancel until the new order is
+        # in, so fees and the quote load while the cancel is in flight and
+        # the remaining amount comes from the cancel response
         if self.status == None:
             raise Exception("No order to replace.")
 
+        start = time.monotonic()
+
+        fees = None
+        if self.reserve_api_fees == RESERVE_FEE_ACTUAL:
+            fees = prefetch_executor.submit(get_fees, self.con)
+        quote = prefetch_executor.submit(get_quote, self.con)
+
         self.status.cancel()
-        self.status.refresh()
+        cancelled = time.monotonic()
+
+        if fees is not None:
+            fees = fees.result()
+        quote = quote.result()
+        prefetched = time.monotonic()
 
         self.quantity = self.status.get_remaining_amount()
         self.quantity_unit = UNIT_BTC
+        if not self.quantity > 0:
+            raise Exception("Order filled before the cancel, nothing to replace.")
+
+        self.prepare(fees=fees, quote=quote)
+        prepared = time.monotonic()
+
+        self.execute()
+        done = time.monotonic()
 
-        self.prepare()
+        self.timings = {
+            "cancel": cancelled - start,
+            "prefetch wait": prefetched - cancelled,
+            "prepare": prepared - prefetched,
+            "submit": done - prepared,
+            "total": done - start,
+        }
+
+        return self.status
 
-        return self.execute()
+    def get_timings(self):
+        return self.timings
 
     def get_status(self):
         return self.status
 
+    def get_client_order_id(self):
+        return self.client_order_id
+
 class OrderStatus:
+    # fields are converted once per response, not on every getter call
+    __slots__ = ("con", "order_id", "client_order_id", "symbol", "side", "type",
+                 "price", "avg_execution_price", "original_amount",
+                 "executed_amount", "remaining_amount", "timestamp",
+                 "timestampms", "live", "cancelled")
+
     def __init__(self, con, data):
         self.con = con
-        self.data = data
+        self.parse(data)
+
+    def parse(self, data):
+        self.order_id = int(data["order_id"])
+        self.client_order_id = data.get("client_order_id")
+        self.symbol = data.get("symbol", SYMBOL_BTCUSD)
+        self.side = data["side"]
+        self.type = data.get("type", TYPE_LIMIT)
+        self.price = float(data["price"])
+        self.avg_execution_price = float(data.get("avg_execution_price", 0))
+        self.original_amount = float(data["original_amount"])
+        self.executed_amount = float(data["executed_amount"])
+        self.remaining_amount = float(data["remaining_amount"])
+        self.timestamp = int(data["timestamp"])
+        self.timestampms = int(data.get("timestampms", self.timestamp * 1000))
+        self.live = bool(data["is_live"])
+        self.cancelled = bool(data["is_cancelled"])
 
     def get_order_id(self):
-        return int(self.data["order_id"])
+        return self.order_id
+
+    def get_client_order_id(self):
+        return self.client_order_id
 
     def get_timestamp(self):
-        return datetime.fromtimestamp(self.data["timestamp"])
+        return datetime.fromtimestamp(self.timestamp)
+
+    def get_timestampms(self):
+        return self.timestampms
 
     def get_side(self):
-        return self.data["side"]
+        return self.side
 
     def get_type(self):
-        return self.data["type"]
+        return self.type
 
     def get_price(self):
-        return float(self.data["price"])
+        return self.price
 
     def get_symbol(self):
-        return float(self.data["symbol"])
+        return self.symbol
 
     def get_original_amount(self):
-        return float(self.data["original_amount"])
+        return self.original_amount
 
     def get_executed_amount(self):
-        return float(self.data["executed_amount"])
+        return self.executed_amount
 
     def get_remaining_amount(self):
-        return float(self.data["remaining_amount"])
+        return self.remaining_amount
 
     def get_avg_execution_price(self):
-        return float(self.data["avg_execution_price"])
+        return self.avg_execution_price
 
     def is_live(self):
-        return bool(self.data["is_live"])
+        return self.live
 
     def is_cancelled(self):
-        return bool(self.data["is_cancelled"])
+        return self.cancelled
 
     def get_total(self):
-        return self.price() * self.original_amount()
+        return self.price * self.original_amount
 
     def refresh(self):
-        res = self.con.order_status(self.get_order_id())
+        res = send_private(self.con.order_status, self.get_order_id())
         if res.status_code != 200:
             raise ApiError(res)
 
-        self.data = res.json()
+        executed_amount = self.get_executed_amount()
+        self.parse(res.json())
+
+        if self.get_executed_amount() > executed_amount:
+            invalidate_fees(self.con)
 
     def cancel(self):
         if self.is_cancelled():
             raise Exception("Order already cancelled.")
 
-        res = self.con.cancel_order(self.get_order_id())
+        res = send_private(self.con.cancel_order, self.get_order_id())
         if res.status_code != 200:
             raise ApiError(res)
 
+        # the cancel response is the final order status
+        executed_amount = self.get_executed_amount()
+        self.parse(res.json())
+
+        if self.get_executed_amount() > executed_amount:
+            invalidate_fees(self.con)
+
     def to_dict(self):
-        return self.data
+        return {
+            "order_id": self.order_id,
+            "client_order_id": self.client_order_id,
+            "symbol": self.symbol,
+            "side": self.side,
+            "type": self.type,
+            "price": self.price,
+            "avg_execution_price": self.avg_execution_price,
+            "original_amount": self.original_amount,
+            "executed_amount": self.executed_amount,
+            "remaining_amount": self.remaining_amount,
+            "timestamp": self.timestamp,
+            "timestampms": self.timestampms,
+            "is_live": self.live,
+            "is_cancelled": self.cancelled,
+        }
 
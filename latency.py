@@ -0,0 +1,78 @@
+"""
+This module contains a thread-safe tracker of recent request latencies.
+"""
+import collections
+import threading
+
+
+class LatencyTracker(object):
+    """
+    The latest request latencies of each endpoint, and hedging counters.
+
+    Each endpoint keeps a fixed window of samples, so percentiles follow the
+    current network rather than the whole session, and a percentile is a
+    sort of at most window samples.
+    """
+
+    def __init__(self, window=200, min_samples=20):
+        """
+        Initialize the class.
+
+        Arguments:
+        window -- samples kept per endpoint (default 200)
+        min_samples -- samples needed before a percentile is reported
+                       (default 20)
+        """
+        self.window = window
+        self.min_samples = min_samples
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.hedges = collections.Counter()
+        self.hedge_wins = collections.Counter()
+
+    def add(self, name, seconds):
+        """Record a request to endpoint name that took seconds."""
+        with self.lock:
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = collections.deque(maxlen=self.window)
+
+            samples.append(seconds)
+
+    def percentile(self, name, pct):
+        """Return the pct percentile latency of name, or None with too few samples."""
+        with self.lock:
+            samples = sorted(self.samples.get(name, ()))
+
+        if len(samples) < self.min_samples:
+            return None
+
+        return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+    def hedged(self, name, won):
+        """Count a duplicate request sent to name, and whether it answered first."""
+        with self.lock:
+            self.hedges[name] += 1
+            if won:
+                self.hedge_wins[name] += 1
+
+    def stats(self):
+        """Return a dict of endpoint name to its sample count, percentiles and hedges."""
+        with self.lock:
+            names = sorted(self.samples)
+
+        stats = {}
+        for name in names:
+            with self.lock:
+                count = len(self.samples[name])
+                hedges = self.hedges[name]
+                wins = self.hedge_wins[name]
+
+            stats[name] = {'count': count,
+                           'p50': self.percentile(name, 50),
+                           'p95': self.percentile(name, 95),
+                           'p99': self.percentile(name, 99),
+                           'hedges': hedges,
+                           'hedge_wins': wins}
+
+        return stats
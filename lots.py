@@ -0,0 +1,194 @@
+"""
+This module contains a lot accounting engine matching sells against buys.
+
+Trades are records.Trade fed in chronological order. Each buy opens a lot, each sell closes
+lots chosen by the matching method. A sell with no open lot to match waits
+for the next buys, as in the original FIFO matching.
+
+Amounts are satoshis and USD values are micro-dollars, see the money module.
+"""
+import heapq
+from collections import deque
+from datetime import datetime
+import money
+
+METHOD_FIFO = "fifo"
+METHOD_LIFO = "lifo"
+METHOD_HIFO = "hifo"
+METHOD_SPECIFIC = "specific"
+
+METHODS = [METHOD_FIFO, METHOD_LIFO, METHOD_HIFO, METHOD_SPECIFIC]
+
+
+class Fill(object):
+    """The unmatched remainder of a buy or sell fill."""
+
+    def __init__(self, trade, seq):
+        self.seq = seq
+        self.order_id = trade.order_id
+        self.side = trade.type.lower()
+        self.timestamp = datetime.fromtimestamp(trade.timestamp)
+        self.price = trade.price
+        self.amount = trade.amount
+        self.fees = trade.fee_amount
+        self.value = money.usd_value(self.price, self.amount)
+
+    def take(self, amount):
+        """Remove amount from the fill, return the pro rata value and fees."""
+        value = money.prorate(self.value, amount, self.amount)
+        fees = money.prorate(self.fees, amount, self.amount)
+
+        self.amount -= amount
+        self.value -= value
+        self.fees -= fees
+
+        return value, fees
+
+
+class ClosedLot(object):
+    """A quantity bought by one fill and sold by another."""
+
+    def __init__(self, buy, sell, amount, buy_value, buy_fees, sell_value,
+                 sell_fees):
+        self.amount = amount
+        self.buy_date = buy.timestamp
+        self.sell_date = sell.timestamp
+        self.buy_price = buy.price
+        self.sell_price = sell.price
+        self.buy_fees = buy_fees
+        self.sell_fees = sell_fees
+        self.total_fees = buy_fees + sell_fees
+        self.basis = buy_value + buy_fees
+        self.proceeds = sell_value - sell_fees
+        self.gain = self.proceeds - self.basis
+        self.gain_pct = self.gain / self.basis * 100 if self.basis else 0.0
+        self.buy_order_id = buy.order_id
+        self.sell_order_id = sell.order_id
+
+
+class OpenLot(object):
+    """The unsold remainder of a buy fill."""
+
+    def __init__(self, buy):
+        self.date = buy.timestamp
+        self.price = buy.price
+        self.amount = buy.amount
+        self.fees = buy.fees
+        self.basis = buy.value + buy.fees
+        self.order_id = buy.order_id
+
+
+class LotEngine(object):
+    """
+    Match sells against open buy lots in a single pass.
+
+    FIFO and LIFO keep open lots in a deque, so matching is O(n). HIFO keeps
+    them in a heap by price and specific-ID indexes them by order id, both
+    O(n log n). Lots used up out of order are skipped lazily when they reach
+    the front, so no container is ever searched.
+    """
+
+    def __init__(self, method=METHOD_FIFO, assignments=None):
+        """
+        Initialize the class.
+
+        Arguments:
+        method -- the lot matching method (default METHOD_FIFO)
+        assignments -- for METHOD_SPECIFIC, a dict of sell order id to the
+                       list of buy order ids it closes, in order (default None)
+        """
+        if method not in METHODS:
+            raise Exception("Lot method {0} not in {1}".format(method, METHODS))
+
+        self.method = method
+        self.assignments = assignments or {}
+        self.seq = 0
+        self.buys = []
+        self.lots = deque()
+        self.heap = []
+        self.by_order_id = {}
+        self.pending = deque()
+        self.closed = []
+
+    def match(self, trades):
+        """Add trades in chronological order, return the engine."""
+        for trade in trades:
+            self.add(trade)
+
+        return self
+
+    def add(self, trade):
+        """Add the next trade in chronological order."""
+        self.seq += 1
+        fill = Fill(trade, self.seq)
+        if fill.amount <= 0:
+            return
+
+        if fill.side == "buy":
+            self.buys.append(fill)
+            self.open(fill)
+
+            # sells seen before any lot was available close against new buys
+            while self.pending and fill.amount > 0:
+                sell = self.pending[0]
+                self.close(fill, sell)
+                if sell.amount <= 0:
+                    self.pending.popleft()
+
+        elif fill.side == "sell":
+            if self.method == METHOD_SPECIFIC:
+                for order_id in self.assignments.get(fill.order_id, []):
+                    for buy in self.by_order_id.get(order_id, []):
+                        if fill.amount <= 0:
+                            break
+                        if buy.amount > 0:
+                            self.close(buy, fill)
+
+            while fill.amount > 0:
+                buy = self.next_lot()
+                if buy is None:
+                    self.pending.append(fill)
+                    break
+
+                self.close(buy, fill)
+
+    def open(self, buy):
+        if self.method == METHOD_HIFO:
+            heapq.heappush(self.heap, (-buy.price, buy.seq, buy))
+        else:
+            self.lots.append(buy)
+
+        if self.method == METHOD_SPECIFIC:
+            self.by_order_id.setdefault(buy.order_id, []).append(buy)
+
+    def next_lot(self):
+        """Return the next open lot to sell per the method, or None."""
+        if self.method == METHOD_HIFO:
+            while self.heap and self.heap[0][2].amount <= 0:
+                heapq.heappop(self.heap)
+            return self.heap[0][2] if self.heap else None
+
+        if self.method == METHOD_LIFO:
+            while self.lots and self.lots[-1].amount <= 0:
+                self.lots.pop()
+            return self.lots[-1] if self.lots else None
+
+        while self.lots and self.lots[0].amount <= 0:
+            self.lots.popleft()
+        return self.lots[0] if self.lots else None
+
+    def close(self, buy, sell):
+        amount = min(buy.amount, sell.amount)
+        buy_value, buy_fees = buy.take(amount)
+        sell_value, sell_fees = sell.take(amount)
+
+        self.closed.append(ClosedLot(buy, sell, amount, buy_value, buy_fees,
+                                     sell_value, sell_fees))
+
+    def get_closed_lots(self):
+        """Return the closed lots in the order they were closed."""
+        return self.closed
+
+    def get_open_lots(self):
+        """Return the open lots in chronological order."""
+        return [OpenLot(b) for b in self.buys if b.amount > 0]
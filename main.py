@@ -1,7 +1,7 @@
-from api import Geminipy
+from api import Geminipy, AsyncGeminipy
+from marketdata import MarketData
 import gemini
 from tabulate import tabulate
-from decimal import Decimal
 from datetime import datetime
 from error import ApiError
 import os
@@ -9,8 +9,17 @@ import sys
 import yaml
 import csv
 import getpass
+import hashlib
 import util
+import lots
+import money
+import table
 import locale
+import asyncio
+import itertools
+import execution
+import triggers
+import views
 
 assert sys.version_info >= (3, 8)
 
@@ -23,10 +32,25 @@ FORMAT_TURBOTAX_CSV= "csv-tt"
 FILE_CONFIG = "config/config.yaml"
 FILE_SANDBOX_CREDS = "config/sandbox.yaml"
 FILE_LIVE_CREDS = "config/live.yaml"
+FILE_TRADE_STORE = "config/trades-{0}-{1}.db"
+FILE_EXECUTION = "config/execution.json"
+
+# seconds between execution schedule steps
+EXECUTION_INTERVAL = 2.0
+
+# seconds between ticker polls feeding triggers while no market data feed is live
+TRIGGER_POLL_INTERVAL = 1.0
+
+trigger_engine = None
 
 OPT_RESERVE_API_FEES = "reserve_api_fees"
 OPT_MAKER_OR_CANCEL = "maker_or_cancel"
 OPT_DEBUG = "debug"
+OPT_LOT_METHOD = "lot_method"
+OPT_TRADE_STORE = "trade_store"
+OPT_MARKET_DATA = "market_data"
+OPT_CHASE = "chase"
+OPT_HEDGE = "hedge"
 
 OPT_VALUE_ON = "on"
 OPT_VALUE_OFF = "off"
@@ -34,13 +58,23 @@ OPT_VALUE_OFF = "off"
 opts = {
     OPT_RESERVE_API_FEES: gemini.RESERVE_FEE_MAX,
     OPT_MAKER_OR_CANCEL: OPT_VALUE_OFF,
-    OPT_DEBUG: OPT_VALUE_OFF
+    OPT_DEBUG: OPT_VALUE_OFF,
+    OPT_LOT_METHOD: lots.METHOD_FIFO,
+    OPT_TRADE_STORE: OPT_VALUE_ON,
+    OPT_MARKET_DATA: OPT_VALUE_OFF,
+    OPT_CHASE: OPT_VALUE_OFF,
+    OPT_HEDGE: OPT_VALUE_OFF
 }
 
 opts_allowed = {
     OPT_RESERVE_API_FEES: [gemini.RESERVE_FEE_NONE, gemini.RESERVE_FEE_ACTUAL, gemini.RESERVE_FEE_MAX],
     OPT_MAKER_OR_CANCEL: [OPT_VALUE_ON, OPT_VALUE_OFF],
-    OPT_DEBUG: [OPT_VALUE_ON, OPT_VALUE_OFF]
+    OPT_DEBUG: [OPT_VALUE_ON, OPT_VALUE_OFF],
+    OPT_LOT_METHOD: [lots.METHOD_FIFO, lots.METHOD_LIFO, lots.METHOD_HIFO],
+    OPT_TRADE_STORE: [OPT_VALUE_ON, OPT_VALUE_OFF],
+    OPT_MARKET_DATA: [OPT_VALUE_ON, OPT_VALUE_OFF],
+    OPT_CHASE: [OPT_VALUE_ON, OPT_VALUE_OFF],
+    OPT_HEDGE: [OPT_VALUE_ON, OPT_VALUE_OFF]
 }
 
 LOTS_OPEN = "open"
@@ -51,13 +85,24 @@ cmds = [
     ['stat', 'avg. cost basis, gain/loss, perf', lambda con: show_history(con, history=False, stats=True)],
     ['list', 'list open orders', lambda con: show_orders(con)],
     ['tick', 'price quote', lambda con: show_quote(con)],
+    ['book', 'order book depth and VWAP', lambda con: show_book(con)],
     ['buy', 'buy in USD quantity including fees', lambda con: buy(con)],
     ['buy btc', 'buy in BTC quantity', lambda con: buy_btc(con)],
     ['sell', 'sell in net USD quantity including fees', lambda con: sell(con)],
     ['sell btc', 'sell in BTC quantity', lambda con: sell_btc(con)],
+    ['ladder', 'place a ladder of limit orders', lambda con: ladder(con)],
+    ['twap', 'work an order in time slices', lambda con: start_execution(con, execution.MODE_TWAP)],
+    ['iceberg', 'work an order showing part of its size', lambda con: start_execution(con, execution.MODE_ICEBERG)],
+    ['exec status', 'show TWAP/iceberg progress', lambda con: show_execution(con)],
+    ['exec resume', 'resume a TWAP/iceberg order', lambda con: resume_execution(con)],
+    ['exec stop', 'stop a TWAP/iceberg order', lambda con: stop_execution(con)],
+    ['trigger', 'add a stop/conditional order', lambda con: add_trigger(con)],
+    ['triggers', 'list stop/conditional orders', lambda con: show_triggers(con)],
+    ['trigger cancel', 'cancel a stop/conditional order', lambda con: cancel_trigger(con)],
     ['status', 'order status', lambda con: show_order_status(con)],
     ['cancel', 'cancel an order', lambda con: cancel_order(con)],
     ['cancel all', 'cancel all orders', lambda con: cancel_all(con)],
+    ['cancel some', 'cancel orders by side, price or age', lambda con: cancel_some(con)],
     ['cancel replace', 'cancel and replace order', lambda con: cancel_and_replace(con)],
     ['history', 'list past trades', lambda con: show_history(con, history=True, stats=True)],
     ['open', 'list open lots', lambda con: show_lots(con, type=LOTS_OPEN, format=FORMAT_TABLE)],
@@ -67,14 +112,19 @@ cmds = [
     ['history export', 'export history to CSV', lambda con: show_history(con, history=True, stats=False, format=FORMAT_CSV)],
     ['turbotax export', 'export turbotax', lambda con: show_lots(con, type=LOTS_CLOSED, format=FORMAT_TURBOTAX_CSV)],
     ['fees', 'show fees', lambda con: show_fees(con)],
+    ['cache', 'cache and request coalescing stats', lambda con: show_cache_stats(con)],
+    ['latency', 'request latency and hedging stats', lambda con: show_latency_stats(con)],
     ['opts', 'view options', lambda con: view_options(con)],
     ['set opt', 'set option', lambda con: set_option(con)],
     ['exit', 'exit the console app', lambda con: done()],
 ]
 
-def show_balances(con):
+def show_balances(con, balances=None):
     try:
-        account_value, available_to_trade_usd, available_to_trade_btc = gemini.get_balances(con)
+        if balances is None:
+            balances = gemini.get_balances(con)
+
+        account_value, available_to_trade_usd, available_to_trade_btc = balances
 
         headers = ["Notational Account Value", "Available to Trade (USD)", "Available to Trade (BTC)"]
         data = [[
@@ -92,9 +142,10 @@ def show_balances(con):
     except Exception as ex:
         util.print_err(ex)
 
-def show_orders(con):
+def show_orders(con, orders=None):
     try:
-        orders = gemini.get_active_orders(con)
+        if orders is None:
+            orders = gemini.get_active_orders(con)
 
         print()
         print("OPEN ORDERS")
@@ -110,7 +161,7 @@ def show_order_status(con):
 
         print()
         print("ORDER STATUS")
-        print_orders([status.to_dict()])
+        print_orders([status])
 
     except Exception as ex:
         util.print_err(ex)
@@ -164,6 +215,268 @@ def sell_btc(con):
     except Exception as ex:
         util.print_err(ex)
 
+def ladder(con):
+    try:
+        side = input("Side ({0}/{1}): ".format(gemini.SIDE_BUY, gemini.SIDE_SELL))
+        if side not in [gemini.SIDE_BUY, gemini.SIDE_SELL]:
+            raise Exception("Invalid side.")
+
+        unit = input("Quantity unit ({0}/{1}): ".format(gemini.UNIT_BTC, gemini.UNIT_USD))
+        if unit not in [gemini.UNIT_BTC, gemini.UNIT_USD]:
+            raise Exception("Invalid quantity unit.")
+
+        low = input("Low price (USD): ")
+        high = input("High price (USD): ")
+        if not util.is_float(low) or not util.is_float(high):
+            raise Exception("Invalid price.")
+
+        rungs = input("Rungs: ")
+        if not util.is_int(rungs):
+            raise Exception("Invalid rung count.")
+
+        quantity = input("Total quantity ({0}): ".format(unit))
+        if not util.is_float(quantity):
+            raise Exception("Invalid quantity.")
+
+        orders = gemini.new_ladder(con, side, low, high, int(rungs), quantity, unit,
+                                   maker_or_cancel=opts[OPT_MAKER_OR_CANCEL] == OPT_VALUE_ON,
+                                   reserve_api_fees=opts[OPT_RESERVE_API_FEES])
+
+        if not confirm_ladder(orders):
+            return
+
+        errors = gemini.execute_ladder(orders)
+
+        print()
+        print("LADDER PLACED")
+        print_ladder_results(orders, errors)
+
+    except Exception as ex:
+        util.print_err(ex)
+
+def confirm_ladder(orders):
+    util.print_header("CONFIRM {0} LADDER:".format(orders[0].get_side().upper()))
+
+    headers = ["rung", "price", "BTC", "subtotal", "fee", "total"]
+    l = []
+    for i, o in enumerate(orders, 1):
+        l.append([i, util.fmt_usd(o.get_price()), util.fmt_btc(o.get_btc_amount()), util.fmt_usd(o.get_subtotal()), util.fmt_usd(o.get_fee()), util.fmt_usd(o.get_total())])
+
+    l.append(["", "", util.fmt_btc(money.sats_to_btc(sum(o.btc_sats for o in orders))),
+              util.fmt_usd(money.micros_to_usd(sum(o.subtotal_micros for o in orders))),
+              util.fmt_usd(money.micros_to_usd(sum(o.fee_micros for o in orders))),
+              util.fmt_usd(money.micros_to_usd(sum(o.total_micros for o in orders)))])
+
+    print(tabulate(l, headers=headers, stralign="right", disable_numparse=True))
+    util.print_sep()
+
+    # rungs share one quote, so print each distinct warning once
+    for warning in dict.fromkeys(w for o in orders for w in o.get_warnings()):
+        print(warning)
+
+    return confirm_order_msg("Execute {0} orders?".format(len(orders)))
+
+def print_ladder_results(orders, errors):
+    headers = ["rung", "price", "BTC", "executed", "is_live", "is_cancelled", "order_id", "error"]
+    l = []
+    for i, (o, ex) in enumerate(zip(orders, errors), 1):
+        if ex is None:
+            status = o.get_status()
+            l.append([i, util.fmt_usd(o.get_price()), util.fmt_btc(o.get_btc_amount()), util.fmt_btc(status.get_executed_amount()), status.is_live(), status.is_cancelled(), status.get_order_id(), ""])
+        else:
+            reason = ex.json.get("reason", ex.code) if type(ex) is ApiError else ex
+            l.append([i, util.fmt_usd(o.get_price()), util.fmt_btc(o.get_btc_amount()), "", "", "", "", reason])
+
+    util.print_sep()
+    print(tabulate(l, headers=headers, stralign="right", disable_numparse=True))
+    util.print_sep()
+
+    placed = errors.count(None)
+    print("{0} of {1} orders placed".format(placed, len(orders)))
+
+def start_execution(con, mode):
+    try:
+        schedule = execution.load_schedule(con, FILE_EXECUTION)
+        if schedule is not None and schedule.get_status() == execution.STATUS_RUNNING:
+            raise Exception("An order is already being worked, use exec resume or exec stop.")
+
+        side = input("Side ({0}/{1}): ".format(gemini.SIDE_BUY, gemini.SIDE_SELL))
+        if side not in [gemini.SIDE_BUY, gemini.SIDE_SELL]:
+            raise Exception("Invalid side.")
+
+        price = get_price(con, side, gemini.UNIT_BTC)
+        quantity = get_quantity(con, side, gemini.UNIT_BTC)
+
+        kwargs = dict(maker_or_cancel=opts[OPT_MAKER_OR_CANCEL] == OPT_VALUE_ON,
+                      reserve_api_fees=opts[OPT_RESERVE_API_FEES],
+                      path=FILE_EXECUTION)
+
+        if mode == execution.MODE_TWAP:
+            slices = input("Slices: ")
+            minutes = input("Duration (minutes): ")
+            if not util.is_int(slices) or not util.is_float(minutes):
+                raise Exception("Invalid slices or duration.")
+
+            schedule = execution.new_twap(con, side, price, quantity, int(slices), float(minutes) * 60, **kwargs)
+        else:
+            visible = input("Visible size (BTC): ")
+            if not util.is_float(visible):
+                raise Exception("Invalid visible size.")
+
+            schedule = execution.new_iceberg(con, side, price, quantity, visible, **kwargs)
+
+        if not confirm_order_msg("Work {0} {1} BTC at {2} as {3}?".format(side, quantity, util.fmt_usd(float(price)), mode)):
+            return
+
+        os.makedirs(os.path.dirname(FILE_EXECUTION), exist_ok=True)
+        run_execution(schedule)
+
+    except Exception as ex:
+        util.print_err(ex)
+
+def resume_execution(con):
+    try:
+        schedule = execution.load_schedule(con, FILE_EXECUTION)
+        if schedule is None or schedule.get_status() != execution.STATUS_RUNNING:
+            print("no order being worked")
+            return
+
+        run_execution(schedule)
+
+    except Exception as ex:
+        util.print_err(ex)
+
+def run_execution(schedule):
+    print()
+    print("WORKING ORDER - ctrl-c to pause, exec resume to continue")
+    try:
+        schedule.run(interval=EXECUTION_INTERVAL, on_step=print_execution_step)
+    except KeyboardInterrupt:
+        print()
+        print("paused")
+
+    print_execution(schedule)
+
+def print_execution_step(schedule):
+    p = schedule.progress()
+    print("{0} {1:.1f}% {2} / {3} BTC avg {4} children {5} live {6}".format(
+        datetime.now().strftime("%H:%M:%S"), p["pct"], util.fmt_btc(p["executed"]), util.fmt_btc(p["quantity"]),
+        util.fmt_usd(p["avg_price"]), p["children"], p["live_order_id"]))
+
+def show_execution(con):
+    try:
+        schedule = execution.load_schedule(con, FILE_EXECUTION)
+        if schedule is None:
+            print("no order being worked")
+            return
+
+        print_execution(schedule)
+
+    except Exception as ex:
+        util.print_err(ex)
+
+def stop_execution(con):
+    try:
+        schedule = execution.load_schedule(con, FILE_EXECUTION)
+        if schedule is None or schedule.get_status() != execution.STATUS_RUNNING:
+            print("no order being worked")
+            return
+
+        schedule.stop()
+        print_execution(schedule)
+
+    except Exception as ex:
+        util.print_err(ex)
+
+def print_execution(schedule):
+    p = schedule.progress()
+    next_due = ""
+    if p["next_due"] is not None:
+        next_due = datetime.fromtimestamp(p["next_due"]).strftime("%H:%M:%S")
+
+    headers = ["mode", "status", "side", "price", "quantity", "executed", "remaining", "done", "avg_price", "children", "live order_id", "next slice"]
+    data = [[p["mode"], p["status"], p["side"], util.fmt_usd(p["price"]), util.fmt_btc(p["quantity"]), util.fmt_btc(p["executed"]),
+             util.fmt_btc(p["remaining"]), util.fmt_pct(p["pct"]), util.fmt_usd(p["avg_price"]), p["children"], p["live_order_id"] or "", next_due]]
+
+    print()
+    print("WORKED ORDER")
+    util.print_sep()
+    print(tabulate(data, headers=headers, stralign="right", disable_numparse=True))
+    util.print_sep()
+
+def get_trigger_engine(con):
+    # started on first use; fed by the market data feed when there is one,
+    # and by polling the ticker while the feed is down
+    global trigger_engine
+    if trigger_engine is None:
+        feed = gemini.market_feeds.get((con.base_url, gemini.SYMBOL_BTCUSD))
+        trigger_engine = triggers.TriggerEngine(con, feed=feed, interval=TRIGGER_POLL_INTERVAL)
+
+    return trigger_engine
+
+def add_trigger(con):
+    try:
+        ref = input("Watch price ({0}): ".format("/".join(triggers.PRICES)))
+        direction = input("Fire when it is ({0}): ".format("/".join(triggers.DIRECTIONS)))
+        level = input("Trigger price (USD): ")
+        if not util.is_float(level):
+            raise Exception("Invalid trigger price.")
+
+        side = input("Side ({0}/{1}): ".format(gemini.SIDE_BUY, gemini.SIDE_SELL))
+        if side not in [gemini.SIDE_BUY, gemini.SIDE_SELL]:
+            raise Exception("Invalid side.")
+
+        price = input("Limit price (USD): ")
+        quantity = input("Quantity ({0}): ".format(gemini.UNIT_BTC))
+        if not util.is_float(price) or not util.is_float(quantity):
+            raise Exception("Invalid price or quantity.")
+
+        t = triggers.Trigger(ref, direction, level, side, price, quantity,
+                             maker_or_cancel=opts[OPT_MAKER_OR_CANCEL] == OPT_VALUE_ON,
+                             reserve_api_fees=opts[OPT_RESERVE_API_FEES])
+
+        if not confirm_order_msg("{0} {1} BTC at {2} when {3} is {4} {5}?".format(side, quantity, util.fmt_usd(t.price), ref, direction, util.fmt_usd(t.level))):
+            return
+
+        trigger_id = get_trigger_engine(con).add(t)
+        print("trigger {0} added; triggers only fire while this app is running".format(trigger_id))
+
+    except Exception as ex:
+        util.print_err(ex)
+
+def show_triggers(con):
+    if trigger_engine is None:
+        print("no triggers")
+        return
+
+    headers = ["id", "when", "order", "state", "fired at", "order_id", "error"]
+    l = []
+    for t in trigger_engine.get_triggers():
+        order_id = ""
+        if t.order is not None:
+            order_id = t.order.get_status().get_order_id()
+
+        fired_price = "" if t.fired_price is None else util.fmt_usd(t.fired_price)
+        l.append([t.id, "{0} {1} {2}".format(t.ref, t.direction, util.fmt_usd(t.level)),
+                  "{0} {1} @ {2}".format(t.side, util.fmt_btc(t.quantity), util.fmt_usd(t.price)),
+                  t.state, fired_price, order_id, "" if t.error is None else t.error])
+
+    print()
+    print("TRIGGERS")
+    util.print_sep()
+    print(tabulate(l, headers=headers, stralign="right", disable_numparse=True))
+    util.print_sep()
+
+    if trigger_engine.poll_error is not None:
+        util.print_err(trigger_engine.poll_error)
+
+def cancel_trigger(con):
+    trigger_id = input("trigger id: ")
+    if trigger_engine is None or not util.is_int(trigger_id) or not trigger_engine.cancel(int(trigger_id)):
+        print("no pending trigger {0}".format(trigger_id))
+    else:
+        print("cancelled trigger {0}".format(trigger_id))
+
 def execute_order(o):
 
     o.set_reserve_api_fees(opts[OPT_RESERVE_API_FEES])
@@ -193,6 +506,17 @@ def execute_order(o):
         else:
             raise
 
+    if o.get_status().is_cancelled() and o.get_maker_or_cancel() and opts[OPT_CHASE] == OPT_VALUE_ON:
+        entered = o.get_price()
+        prices = gemini.chase_order(o)
+
+        print()
+        print("CHASED {0} -> {1} in {2} attempts".format(util.fmt_usd(entered), util.fmt_usd(o.get_price()), len(prices)))
+
+        # fall back to the entered price if it never rested
+        if o.get_status().is_cancelled():
+            o.set_price(entered)
+
     if o.get_status().is_cancelled() and o.get_maker_or_cancel():
         print()
         print("AUTO CANCELLED - MAKER FEE NOT AVAILABLE!")
@@ -210,7 +534,7 @@ def execute_order(o):
 
     print()
     print("OK!")
-    print_orders([o.get_status().to_dict()])
+    print_orders([o.get_status()])
 
 def get_price_quantity(con, side, unit):
     print("{0} {1}".format(side.upper(), unit))
@@ -315,6 +639,7 @@ def cancel_and_replace(con):
             return
 
         o.cancel_and_replace()
+        timings = o.get_timings()
 
         if o.get_status().is_cancelled():
             o.set_maker_or_cancel(False)
@@ -330,189 +655,88 @@ def cancel_and_replace(con):
 
         print()
         print("ORDER REPLACED")
-        print_orders([o.get_status().to_dict()])
+        print_orders([o.get_status()])
+        print_timings(timings)
 
     except Exception as ex:
         util.print_err(ex)
         return
 
-def print_orders(orders):
-    headers = ["date", "side", "total", "type", "price", "original_amount", "symbol", "executed_amount", "avg_execution_price", "remaining_amount", "is_live", "is_cancelled", "order_id"]
-    l = []
-    for o in orders:
-        price = float(o["price"])
-        quantity = float(o["original_amount"])
-        total = price * quantity
-        o["total"] = util.fmt_usd(total)
-        o["price"] = util.fmt_usd(price)
-        o["avg_execution_price"] = util.fmt_usd(float(o["avg_execution_price"]))
-        o["date"] = util.fmt_date(datetime.fromtimestamp(int(o["timestamp"])))
-        item = []
-        for h in headers:
-            item.append(o[h])
-        l.append(item)
+def print_timings(timings):
+    print(tabulate([[k, "{0:.1f} ms".format(v * 1000)] for k, v in timings.items()], headers=["replace step", "time"], stralign="right"))
+    util.print_sep()
 
+def print_orders(orders):
     util.print_sep()
-    print(tabulate(l, headers=headers, floatfmt=".8g", stralign="right"))
+    print(tabulate([views.order_row(o) for o in orders], headers=views.ORDER_HEADERS, stralign="right", disable_numparse=True))
     util.print_sep()
 
 def show_lots(con, type=LOTS_CLOSED, format=FORMAT_TABLE):
     try:
-        symbol = "btcusd"
-        res = con.past_trades(symbol=symbol, limit_trades=1000)
-        if res.status_code != 200:
-            raise ApiError(res)
-
-        orders = res.json()
+        symbol = gemini.SYMBOL_BTCUSD
+        bid, ask, spread, last = gemini.get_quote(con, max_age=gemini.QUOTE_MAX_AGE_RELAXED)
 
-        bid, ask, spread, last = gemini.get_quote(con)
-
-        # match all sales & allocate lots in FIFO order
-
-        total_amount = 0.0
-        total_proceeds = 0.0
-        total_basis = 0.0
-        total_gain = 0.0
-        total_buy_fees = 0.0
-        total_sell_fees = 0.0
-        total_fees = 0.0
-
-        closed_positions = []
-
-        for x in orders[::-1]:
-            x_amount = float(x["amount"])
-            if x_amount <= 0:
-                continue
-            if gemini.is_side(x["type"], gemini.SIDE_SELL):
-                for y in orders[::-1]:
-                    if gemini.is_side(y["type"], gemini.SIDE_BUY):
-                        y_amount = float(y["amount"])
-                        if y_amount <= 0:
-                            continue
+        # match all sales & allocate lots as the trade history pages in
+        method = opts[OPT_LOT_METHOD]
+        engine = lots.LotEngine(method=method).match(gemini.iter_trades(con, symbol=symbol))
 
-                        x_amount = float(x["amount"])
-                        x_order_id = x["order_id"]
-                        x_price = float(x["price"])
-                        x_quantity = float(x["amount"])
-                        x_fees = float(x["fee_amount"])
-                        x_proceeds = x_price * x_quantity - x_fees
-                        x_dt = datetime.fromtimestamp(x["timestamp"])
-                        x_date = util.fmt_date(x_dt)
-
-                        y_amount = float(y["amount"])
-                        y_order_id = y["order_id"]
-                        y_price = float(y["price"])
-                        y_quantity = float(y["amount"])
-                        y_fees = float(y["fee_amount"])
-                        y_basis = y_price * y_quantity + y_fees
-                        y_dt = datetime.fromtimestamp(y["timestamp"])
-                        y_date = util.fmt_date(y_dt)
-
-                        z_amount = min(x_amount, y_amount)
-                        z_proceeds = x_proceeds / x_amount * z_amount
-                        z_basis = y_basis / y_amount * z_amount
-                        z_gain = z_proceeds - z_basis
-                        z_gain_pct = z_gain / z_basis * 100
-                        z_buy_fees = y_fees / y_amount * z_amount
-                        z_sell_fees = x_fees / x_amount * z_amount
-                        z_fees = z_buy_fees + z_sell_fees
-
-                        z = {
-                            'amount': util.fmt_btc_long(z_amount),
-                            'buy_date': y_date,
-                            'sell_date': x_date,
-                            'proceeds': util.fmt_usd(z_proceeds),
-                            'basis': util.fmt_usd(z_basis),
-                            'gain': util.fmt_usd(z_gain),
-                            'gain_pct': util.fmt_pct(z_gain_pct),
-                            'buy_fees': util.fmt_usd(z_buy_fees),
-                            'sell_fees': util.fmt_usd(z_sell_fees),
-                            'total_fees': util.fmt_usd(z_fees),
-                            'buy_order_id': y_order_id,
-                            'sell_order_id': x_order_id,
-                        }
-
-                        total_amount += z_amount
-                        total_proceeds += z_proceeds
-                        total_basis += z_basis
-                        total_gain += z_gain
-                        total_buy_fees += z_buy_fees
-                        total_sell_fees += z_sell_fees
-                        total_fees += z_fees
-
-                        # adjust extracted sale from history
-                        x_amount -= z_amount
-                        y_amount -= z_amount
-
-                        x_fees -= z_sell_fees
-                        y_fees -= z_buy_fees
-
-                        if abs(x_amount) < 0.00000001:
-                            x_amount = 0
-
-                        if abs(y_amount) < 0.00000001:
-                            y_amount = 0
-
-                        x['amount'] = x_amount
-                        y['amount'] = y_amount
-
-                        x['fee_amount'] = x_fees
-                        y['fee_amount'] = y_fees
-
-                        closed_positions.append(z)
-
-                        if x_amount <= 0:
-                            break;
+        closed_lots = engine.get_closed_lots()
 
         taxyear = get_year("Tax Year (default: all): ")
         if len(taxyear) > 0:
             taxyear = int(taxyear)
-            def filter_taxyear(z):
-                year = util.to_date(z['sell_date']).year
-                return year == taxyear
-
-            closed_positions = list(filter(filter_taxyear, closed_positions))
-
+            closed_lots = [z for z in closed_lots if z.sell_date.year == taxyear]
 
         # CLOSED LOTS
         if type == LOTS_CLOSED:
             headers = ["amount", "buy_date", "sell_date", "proceeds","basis", "gain", "gain_pct", "buy_fees", "sell_fees", "total_fees", "buy_order_id", "sell_order_id"]
-            l = []
-            for p in closed_positions[::-1]:
-                item = []
-                for h in headers:
-                    item.append(p[h])
-                l.append(item)
+            closed_positions = [views.closed_lot_row(z) for z in closed_lots]
 
             if format == FORMAT_TABLE:
+                l = []
+                for p in closed_positions[::-1]:
+                    item = []
+                    for h in headers:
+                        item.append(p[h])
+                    l.append(item)
+
                 print()
-                print("CLOSED LOTS - FIFO ORDERING")
+                print("CLOSED LOTS - {0} ORDERING".format(method.upper()))
                 util.print_sep()
                 print(tabulate(l, headers=headers, floatfmt=".8g", stralign="right"))
                 util.print_sep()
 
-                avg_cost_basis = total_basis/total_amount
-                total_gain_pct = (total_proceeds/total_basis - 1) * 100
-
-                # CLOSED LOT STATS
-                headers = ["amount", "proceeds", "basis", "gain/loss", "gain/loss %", "avg cost basis/btc", "buy fees", "sell fees", "total fees"]
-                stats = [[
-                        util.fmt_btc(total_amount),
-                        util.fmt_usd(total_proceeds),
-                        util.fmt_usd(total_basis),
-                        util.fmt_usd(total_gain),
-                        util.fmt_pct(total_gain_pct),
-                        util.fmt_usd(avg_cost_basis),
-                        util.fmt_usd(total_buy_fees),
-                        util.fmt_usd(total_sell_fees),
-                        util.fmt_usd(total_fees),
-                        ]]
+                total_amount = money.sats_to_btc(sum(z.amount for z in closed_lots))
+                total_proceeds = money.micros_to_usd(sum(z.proceeds for z in closed_lots))
+                total_basis = money.micros_to_usd(sum(z.basis for z in closed_lots))
+                total_gain = money.micros_to_usd(sum(z.gain for z in closed_lots))
+                total_buy_fees = money.micros_to_usd(sum(z.buy_fees for z in closed_lots))
+                total_sell_fees = money.micros_to_usd(sum(z.sell_fees for z in closed_lots))
+                total_fees = total_buy_fees + total_sell_fees
 
-                print()
-                print("CLOSED LOT STATS")
-                util.print_sep()
-                print(tabulate(stats, headers=headers, stralign="right"))
-                util.print_sep()
+                if total_amount > 0:
+                    avg_cost_basis = total_basis/total_amount
+                    total_gain_pct = (total_proceeds/total_basis - 1) * 100
+
+                    # CLOSED LOT STATS
+                    headers = ["amount", "proceeds", "basis", "gain/loss", "gain/loss %", "avg cost basis/btc", "buy fees", "sell fees", "total fees"]
+                    stats = [[
+                            util.fmt_btc(total_amount),
+                            util.fmt_usd(total_proceeds),
+                            util.fmt_usd(total_basis),
+                            util.fmt_usd(total_gain),
+                            util.fmt_pct(total_gain_pct),
+                            util.fmt_usd(avg_cost_basis),
+                            util.fmt_usd(total_buy_fees),
+                            util.fmt_usd(total_sell_fees),
+                            util.fmt_usd(total_fees),
+                            ]]
+
+                    print()
+                    print("CLOSED LOT STATS")
+                    util.print_sep()
+                    print(tabulate(stats, headers=headers, stralign="right"))
+                    util.print_sep()
 
             elif format == FORMAT_CSV:
                 filename = input("Filename (defauilt: closed-lots.csv):")
@@ -538,14 +762,14 @@ def show_lots(con, type=LOTS_CLOSED, format=FORMAT_TABLE):
 
                 def bitcointax_turbotax(z):
                     return {
-                        'Asset name': "{:.8f} BTC".format(float(z['amount'])),
-                        'Received Date': z['buy_date'],
-                        'Cost Basis (USD)': z['basis'],
-                        'Date sold': z['sell_date'],
-                        'Proceeds': z['proceeds'],
+                        'Asset name': "{0} BTC".format(money.fmt_sats(z.amount)),
+                        'Received Date': util.fmt_date(z.buy_date),
+                        'Cost Basis (USD)': util.fmt_usd(money.micros_to_usd(z.basis)),
+                        'Date sold': util.fmt_date(z.sell_date),
+                        'Proceeds': util.fmt_usd(money.micros_to_usd(z.proceeds)),
                     }
 
-                tt_closed_positions = map(bitcointax_turbotax, closed_positions)
+                tt_closed_positions = map(bitcointax_turbotax, closed_lots)
 
                 print()
                 print("writing closed lots (turbotax) to " + filename)
@@ -564,54 +788,24 @@ def show_lots(con, type=LOTS_CLOSED, format=FORMAT_TABLE):
         if type == LOTS_OPEN:
             # OPEN LOTS
             headers = ["date", "type", "price", "amount", "basis", "current", "gain", "gain_pct", "symbol", "fee_amount", "order_id"]
-            total_amount = 0.0
-            total_basis = 0.0
-            total_current = 0.0
-            total_fees = 0.0
-            l = []
-            for o in orders:
-                quantity = float(o["amount"])
-                side = o["type"]
-
-                if quantity <= 0:
-                    continue
-
-                # skip unmatched sell orders
-                if gemini.is_side(side, gemini.SIDE_SELL):
-                    continue
-
-                price = float(o["price"])
-                quantity = float(o["amount"])
-                fees = float(o["fee_amount"])
-                basis = price * quantity + fees
-                current = quantity * last
-                gain = current - basis
-                gain_pct = gain / basis * 100
-                dt = datetime.fromtimestamp(o["timestamp"])
-                o["date"] = dt.strftime("%m/%d/%Y")
-                o["amount"] = util.fmt_btc(quantity)
-                o["fee_amount"] = util.fmt_usd(fees)
-                o["price"] = util.fmt_usd(price)
-                o["basis"] = util.fmt_usd(basis)
-                o["current"] = util.fmt_usd(current)
-                o["symbol"] = symbol
-                o["gain"] = util.fmt_usd(gain)
-                o["gain_pct"] = util.fmt_pct(gain_pct)
-
-                item = []
-                for h in headers:
-                    item.append(o[h])
-                l.append(item)
-
-                if gemini.is_side(side, gemini.SIDE_BUY):
-                    total_amount += quantity
-                    total_basis += basis
-                    total_current += current
-                    total_fees += fees
+            open_lots = engine.get_open_lots()
+            open_positions = [views.open_lot_row(o, symbol, last) for o in open_lots[::-1]]
+
+            total_amount = money.sats_to_btc(sum(o.amount for o in open_lots))
+            total_basis = money.micros_to_usd(sum(o.basis for o in open_lots))
+            total_current = total_amount * last
+            total_fees = money.micros_to_usd(sum(o.fees for o in open_lots))
 
             if format == FORMAT_TABLE:
+                l = []
+                for p in open_positions:
+                    item = []
+                    for h in headers:
+                        item.append(p[h])
+                    l.append(item)
+
                 print()
-                print("OPEN LOTS - FIFO ORDERING")
+                print("OPEN LOTS - {0} ORDERING".format(method.upper()))
                 util.print_sep()
                 print(tabulate(l, headers=headers, floatfmt=".8g", stralign="right"))
                 util.print_sep()
@@ -622,10 +816,11 @@ def show_lots(con, type=LOTS_CLOSED, format=FORMAT_TABLE):
                     total_gain = total_current - total_basis
                     total_gain_pct = (total_current/total_basis - 1) * 100
 
-                    headers = ["amount", "basis", "current value", "gain/loss", "gain/loss %", "avg cost basis/btc", "buy fees", "sell fees", "total fees"]
+                    headers = ["amount", "basis", "current value", "gain/loss", "gain/loss %", "avg cost basis/btc", "buy fees"]
                     stats = [[
                             util.fmt_btc(total_amount),
                             util.fmt_usd(total_basis),
+                            util.fmt_usd(total_current),
                             util.fmt_usd(total_gain),
                             util.fmt_pct(total_gain_pct),
                             util.fmt_usd(avg_cost_basis),
@@ -655,9 +850,8 @@ def show_lots(con, type=LOTS_CLOSED, format=FORMAT_TABLE):
                     writer = csv.DictWriter(csvfile, fieldnames=headers, delimiter='\t', extrasaction='ignore')
 
                     writer.writeheader()
-                    for o in orders:
-                        if float(o["amount"]) > 0:
-                            writer.writerow(o)
+                    for o in open_positions:
+                        writer.writerow(o)
                 print("done.")
             else:
                 print("Invalid format: " + format)
@@ -665,66 +859,26 @@ def show_lots(con, type=LOTS_CLOSED, format=FORMAT_TABLE):
     except Exception as ex:
         util.print_err(ex)
 
-
-def show_history(con, history=True, stats=True, format=FORMAT_TABLE):
+def show_history(con, history=True, stats=True, format=FORMAT_TABLE, orders=None, quote=None):
     try:
-        symbol = "btcusd"
-        res = con.past_trades(symbol=symbol, limit_trades=1000)
-        if res.status_code != 200:
-            raise ApiError(res)
+        symbol = gemini.SYMBOL_BTCUSD
+        if orders is None:
+            orders = gemini.get_past_trades(con, symbol=symbol)
 
-        orders = res.json()
-        headers = ["date", "type", "price", "amount", "basis/proceeds", "symbol", "fee_amount", "order_id"]
-        l = []
-        total_buy_basis = 0.0
-        total_buy_amount = 0.0
-        total_buy_fees = 0.0
-        total_sell_proceeds = 0.0
-        total_sell_amount = 0.0
-        total_sell_fees = 0.0
-
-        bid, ask, spread, last = gemini.get_quote(con)
-
-        for o in orders:
-            price = float(o["price"])
-            quantity = float(o["amount"])
-            fees = float(o["fee_amount"])
-            basis = price * quantity + fees
-            proceeds = price * quantity - fees
-            current = quantity * last
-            gain = current - basis
-            gain_pct = gain / basis * 100
-            dt = datetime.fromtimestamp(o["timestamp"])
-            o["date"] = dt.strftime("%m/%d/%Y")
-            o["amount"] = util.fmt_btc(quantity)
-            o["fee_amount"] = util.fmt_usd(fees)
-            o["price"] = util.fmt_usd(price)
-            o["basis"] = util.fmt_usd(basis)
-            o["current"] = util.fmt_usd(current)
-            o["symbol"] = symbol
-
-            side = o["type"]
-            if gemini.is_side(side, gemini.SIDE_BUY):
-                o["basis/proceeds"] = basis
-            if gemini.is_side(side, gemini.SIDE_SELL):
-                o["basis/proceeds"] = proceeds
-
-            item = []
-            for h in headers:
-                item.append(o[h])
-            l.append(item)
-
-            if gemini.is_side(side, gemini.SIDE_BUY):
-                total_buy_basis += basis
-                total_buy_amount += quantity
-                total_buy_fees += fees
-            if gemini.is_side(side, gemini.SIDE_SELL):
-                total_sell_proceeds += proceeds
-                total_sell_amount += quantity
-                total_sell_fees += fees
+        trades = table.TradeTable(orders)
 
         if history:
+            headers = ["date", "type", "price", "amount", "basis/proceeds", "symbol", "fee_amount", "order_id"]
+            rows = views.history_rows(trades, symbol)
+
             if format == FORMAT_TABLE:
+                l = []
+                for r in rows:
+                    item = []
+                    for h in headers:
+                        item.append(r[h])
+                    l.append(item)
+
                 print()
                 print("TRANSACTION HISTORY")
                 util.print_sep()
@@ -742,33 +896,50 @@ def show_history(con, history=True, stats=True, format=FORMAT_TABLE):
                     writer = csv.DictWriter(csvfile, fieldnames=headers, delimiter='\t', extrasaction='ignore')
 
                     writer.writeheader()
-                    for o in orders:
-                        writer.writerow(o)
+                    for r in rows:
+                        writer.writerow(r)
                 print("done.")
             else:
                 print("Invalid format: " + format)
 
         if stats:
-            #TODO: calc realized and unrealized gain/loss
-            avg_cost_basis = total_buy_basis/total_buy_amount
-            current_amount = total_buy_amount - total_sell_amount
-            if current_amount < 0:
-                current_amount = 0
-            current_value = current_amount * last
+            if quote is None:
+                quote = gemini.get_quote(con, max_age=gemini.QUOTE_MAX_AGE_RELAXED)
+
+            bid, ask, spread, last = quote
+            last_micros = money.to_micros(last)
+
+            total_buy_amount = trades.total(trades.amount, trades.buy)
+            total_sell_amount = trades.total(trades.amount, trades.sell)
+            total_buy_basis = trades.basis(trades.buy)
+            total_sell_proceeds = trades.proceeds(trades.sell)
+            total_buy_fees = trades.total(trades.fee, trades.buy)
+            total_sell_fees = trades.total(trades.fee, trades.sell)
+
+            current_amount = max(total_buy_amount - total_sell_amount, 0)
+            current_value = money.usd_value(last_micros, current_amount)
             total_gain = total_sell_proceeds + current_value - total_buy_basis
-            total_gain_pct = (total_gain / total_buy_basis) * 100
 
-            headers = ["avg cost basis/btc", "cost basis", "proceeds", "current amount", "current value", "gain", "gain %",  "buy fees", "sell fees"]
+            avg_cost_basis = money.micros_to_usd(total_buy_basis) / money.sats_to_btc(total_buy_amount)
+            total_gain_pct = total_gain / total_buy_basis * 100
+
+            engine = lots.LotEngine(method=opts[OPT_LOT_METHOD]).match(orders[::-1])
+            realized_gain = sum(z.gain for z in engine.get_closed_lots())
+            unrealized_gain = sum(money.usd_value(last_micros, o.amount) - o.basis for o in engine.get_open_lots())
+
+            headers = ["avg cost basis/btc", "cost basis", "proceeds", "current amount", "current value", "gain", "gain %", "realized", "unrealized", "buy fees", "sell fees"]
             stats = [[
                     util.fmt_usd(avg_cost_basis),
-                    util.fmt_usd(total_buy_basis),
-                    util.fmt_usd(total_sell_proceeds),
-                    util.fmt_btc(current_amount),
-                    util.fmt_usd(current_value),
-                    util.fmt_usd(total_gain),
+                    util.fmt_usd(money.micros_to_usd(total_buy_basis)),
+                    util.fmt_usd(money.micros_to_usd(total_sell_proceeds)),
+                    money.fmt_sats(current_amount),
+                    util.fmt_usd(money.micros_to_usd(current_value)),
+                    util.fmt_usd(money.micros_to_usd(total_gain)),
                     util.fmt_pct(total_gain_pct),
-                    util.fmt_usd(total_buy_fees),
-                    util.fmt_usd(total_sell_fees),
+                    util.fmt_usd(money.micros_to_usd(realized_gain)),
+                    util.fmt_usd(money.micros_to_usd(unrealized_gain)),
+                    util.fmt_usd(money.micros_to_usd(total_buy_fees)),
+                    util.fmt_usd(money.micros_to_usd(total_sell_fees)),
                     ]]
 
             print()
@@ -780,9 +951,12 @@ def show_history(con, history=True, stats=True, format=FORMAT_TABLE):
     except Exception as ex:
         util.print_err(ex)
 
-def show_quote(con):
+def show_quote(con, quote=None):
     try:
-        bid, ask, spread, last = gemini.get_quote(con)
+        if quote is None:
+            quote = gemini.get_quote(con)
+
+        bid, ask, spread, last = quote
 
         print()
         print("QUOTE")
@@ -792,12 +966,54 @@ def show_quote(con):
         print("{0} BID".format(util.fmt_nbr(bid)))
         util.print_sep()
 
+        feed = gemini.market_feeds.get((con.base_url, gemini.SYMBOL_BTCUSD))
+        if feed is not None and not feed.is_live() and feed.error is not None:
+            print("market data feed down, quoted from the ticker: {0}".format(feed.error))
+
         return bid, ask, spread, last
 
     except Exception as ex:
         util.print_err(ex) 
 
 
+def show_book(con):
+    try:
+        size = input("Size (BTC, default: 1): ")
+        if len(size) == 0:
+            size = "1"
+        if not util.is_float(size):
+            raise Exception("Invalid size.")
+        size = float(size)
+
+        book = gemini.get_order_book(con)
+
+        headers = ["bid amount", "bid", "ask", "ask amount"]
+        bids = list(itertools.islice(book.walk(gemini.SIDE_BID), 10))
+        asks = list(itertools.islice(book.walk(gemini.SIDE_ASK), 10))
+        l = []
+        for i in range(max(len(bids), len(asks))):
+            bid_price, bid_amount = bids[i] if i < len(bids) else ("", "")
+            ask_price, ask_amount = asks[i] if i < len(asks) else ("", "")
+            l.append([bid_amount, bid_price, ask_price, ask_amount])
+
+        print()
+        print("ORDER BOOK")
+        util.print_sep()
+        print(tabulate(l, headers=headers, floatfmt=".8g", stralign="right"))
+        util.print_sep()
+
+        headers = ["side", "size", "filled", "vwap"]
+        l = []
+        for side, book_side in [(gemini.SIDE_BUY, gemini.SIDE_ASK), (gemini.SIDE_SELL, gemini.SIDE_BID)]:
+            vwap, filled = book.vwap(book_side, size)
+            l.append([side, util.fmt_btc(size), util.fmt_btc(filled), util.fmt_usd(vwap) if vwap else ""])
+
+        print(tabulate(l, headers=headers, stralign="right"))
+        util.print_sep()
+
+    except Exception as ex:
+        util.print_err(ex)
+
 def cancel_order(con):
     try:
         order_id = input("order_id: ")
@@ -810,15 +1026,79 @@ def cancel_order(con):
         return
 
 def cancel_all(con):
-    res = con.cancel_all()
+    res = gemini.send_private(con.cancel_all)
     if res.status_code != 200:
         util.print_res(res)
     else:
         print("all orders cancelled")
 
+def cancel_some(con):
+    try:
+        side = input("Side ({0}/{1}, default: any): ".format(gemini.SIDE_BUY, gemini.SIDE_SELL))
+        if len(side) == 0:
+            side = None
+        elif side not in [gemini.SIDE_BUY, gemini.SIDE_SELL]:
+            raise Exception("Invalid side.")
+
+        min_price = get_optional_float("Min price (USD, default: any): ")
+        max_price = get_optional_float("Max price (USD, default: any): ")
+        min_age = get_optional_float("Min age (minutes, default: any): ")
+        if min_age is not None:
+            min_age = min_age * 60
+
+        orders = gemini.get_active_orders(con)
+        selected = gemini.select_orders(orders, side=side, min_price=min_price, max_price=max_price, min_age=min_age)
+        if len(selected) == 0:
+            print("no matching orders")
+            return
+
+        print()
+        print("MATCHING ORDERS")
+        print_orders(selected)
+
+        if not confirm_order_msg("Cancel {0} of {1} orders?".format(len(selected), len(orders))):
+            return
+
+        errors = gemini.cancel_orders(selected)
+
+        print()
+        print("CANCEL RESULTS")
+        print_cancel_results(selected, errors)
+
+    except Exception as ex:
+        util.print_err(ex)
+
+def get_optional_float(prompt):
+    val = input(prompt)
+    if len(val) == 0:
+        return None
+
+    if not util.is_float(val):
+        raise Exception("Invalid number.")
+
+    return float(val)
+
+def print_cancel_results(orders, errors):
+    headers = ["order_id", "side", "price", "original_amount", "executed_amount", "outcome"]
+    l = []
+    for o, ex in zip(orders, errors):
+        if ex is None:
+            outcome = "cancelled" if o.is_cancelled() else "not cancelled"
+        else:
+            outcome = ex.json.get("reason", ex.code) if type(ex) is ApiError else ex
+
+        l.append([o.get_order_id(), o.get_side(), util.fmt_usd(o.get_price()), util.fmt_btc(o.get_original_amount()), util.fmt_btc(o.get_executed_amount()), outcome])
+
+    util.print_sep()
+    print(tabulate(l, headers=headers, stralign="right", disable_numparse=True))
+    util.print_sep()
+
+    cancelled = sum(1 for o, ex in zip(orders, errors) if ex is None and o.is_cancelled())
+    print("{0} of {1} orders cancelled".format(cancelled, len(orders)))
+
 def show_fees(con):
     try:
-        api_maker_fee, api_taker_fee, web_maker_fee, web_taker_fee = gemini.get_fees(con)
+        api_maker_fee, api_taker_fee, web_maker_fee, web_taker_fee = gemini.get_fees(con, max_age=0)
         if api_maker_fee < 0:
             return
 
@@ -867,12 +1147,17 @@ def set_option(con):
     opts[opt] = val
 
     print("option set: {0} = {1}".format(opt, val))
+    if opt == OPT_MARKET_DATA:
+        print("market data is started at login, the change takes effect on the next login")
 
-    apply_options()
+    apply_options(con)
 
-def apply_options():
+def apply_options(con=None):
     util.debug = opts[OPT_DEBUG] == OPT_VALUE_ON
 
+    if con is not None:
+        con.hedge = opts[OPT_HEDGE] == OPT_VALUE_ON
+
 def init():
     os.system('clear')
 
@@ -987,13 +1272,25 @@ def init():
             print("Error: invalid keys.")
             continue
 
-        con = Geminipy(api_key=api_key, secret_key=secret_key, live=live)
-        res = con.balances()
+        con = Geminipy(api_key=api_key, secret_key=secret_key, live=live,
+                       hedge=opts[OPT_HEDGE] == OPT_VALUE_ON)
+        try:
+            res = con.balances()
+        except Exception as ex:
+            util.print_err(ex)
+            continue
+
         if res.status_code != 200:
             util.print_res(res)
             continue
 
         #got keys
+        if opts[OPT_TRADE_STORE] == OPT_VALUE_ON:
+            open_trade_store(con, live)
+
+        if opts[OPT_MARKET_DATA] == OPT_VALUE_ON:
+            start_market_data(con, live)
+
         os.system('clear')
         print()
 
@@ -1008,16 +1305,89 @@ def init():
             print("****      SANDBOX      ****")
             print("***************************")
 
-        show_balances(con)
-        show_history(con, history=False, stats=True)
-        show_orders(con)
-        show_quote(con)
+        show_dashboard(con)
 
         print()
         print("help or ? for commands")
 
         return con
 
+def show_dashboard(con):
+    acon = AsyncGeminipy(con)
+    try:
+        balances, orders, trades, quote = asyncio.run(load_dashboard(acon))
+    finally:
+        acon.close()
+
+    sections = [
+        (balances, lambda: show_balances(con, balances=balances)),
+        (trades, lambda: show_history(con, history=False, stats=True, orders=trades, quote=quote)),
+        (orders, lambda: show_orders(con, orders=orders)),
+        (quote, lambda: show_quote(con, quote=quote)),
+    ]
+
+    for data, show in sections:
+        if isinstance(data, Exception):
+            util.print_err(data)
+        else:
+            show()
+
+async def load_dashboard(acon):
+    # independent reads, so the dashboard costs the slowest one instead of the
+    # sum; a private read reaching the exchange out of nonce order is resent
+    return await asyncio.gather(
+        gemini.get_balances_async(acon),
+        gemini.get_active_orders_async(acon),
+        gemini.get_past_trades_async(acon),
+        gemini.get_quote_async(acon),
+        return_exceptions=True)
+
+def show_cache_stats(con):
+    caches = [["quote", gemini.quote_cache.stats()], ["fees", gemini.fee_cache.stats()],
+              ["public reads", con.public_reads.stats()], ["private reads", con.private_reads.stats()]]
+
+    print()
+    print("CACHE STATS")
+    util.print_sep()
+    print(tabulate([[name, stats["hits"], stats["misses"]] for name, stats in caches], headers=["cache", "hits", "misses"]))
+    util.print_sep()
+
+def show_latency_stats(con):
+    def ms(seconds):
+        return "" if seconds is None else "{0:.0f}".format(seconds * 1000)
+
+    rows = [[name, stats["count"], ms(stats["p50"]), ms(stats["p95"]), ms(stats["p99"]),
+             stats["hedges"], stats["hedge_wins"]]
+            for name, stats in con.latency.stats().items()]
+
+    print()
+    print("LATENCY STATS (ms)")
+    util.print_sep()
+    print(tabulate(rows, headers=["endpoint", "count", "p50", "p95", "p99", "hedges", "hedge wins"]))
+    util.print_sep()
+
+def open_trade_store(con, live):
+    site = "live" if live else "sandbox"
+    key_id = hashlib.sha256(con.api_key.encode()).hexdigest()[:12]
+    filepath = FILE_TRADE_STORE.format(site, key_id)
+
+    try:
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        gemini.open_trade_store(con, filepath)
+    except Exception as ex:
+        print()
+        print("Warning: unable to open trade store " + filepath)
+        print(ex)
+
+def start_market_data(con, live):
+    feed = MarketData(symbol=gemini.SYMBOL_BTCUSD, live=live)
+    feed.start()
+
+    try:
+        gemini.attach_market_data(con, feed)
+    except Exception as ex:
+        util.print_err(ex)
+
 def done():
     print("Have a good one!")
     return False
@@ -0,0 +1,186 @@
+"""
+This module contains a streaming client for the Gemini market data WebSocket.
+
+Market data docs: https://docs.gemini.com/websocket-api/#market-data
+"""
+import json
+import time
+import threading
+import websocket
+import util
+from book import OrderBook
+from records import Quote
+
+
+class MarketData(object):
+    """
+    Keep top of book, the last trade and a local L2 book current in memory.
+
+    A background thread subscribes to the market data feed. The first update
+    carries the whole book, later updates carry changes and trades. A gap in
+    socket_sequence, an error or a silent socket drops the state and
+    reconnects, which resyncs from a fresh initial book.
+    """
+
+    live_url = 'wss://api.gemini.com/v1/marketdata/'
+    sandbox_url = 'wss://api.sandbox.gemini.com/v1/marketdata/'
+
+    # the feed sends a heartbeat every 5 seconds
+    stale_after = 10
+    max_backoff = 30
+
+    def __init__(self, symbol='btcusd', live=False, url=None):
+        """
+        Initialize the class.
+
+        Arguments:
+        symbol -- currency symbol (default 'btcusd')
+        live -- use the live feed? otherwise, use the sandbox (default False)
+        url -- an explicit feed url, e.g. a local test server (default None)
+        """
+        self.symbol = symbol
+        self.url = url
+
+        if url is None:
+            base_url = self.live_url if live else self.sandbox_url
+            self.url = base_url + symbol + '?heartbeat=true'
+
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+        self.ws = None
+        self.last = None
+        self.reconnects = 0
+        # the exception that dropped the last connection, if any
+        self.error = None
+        self.listeners = []
+        self.reset()
+
+    def reset(self):
+        """Drop the book so nothing is served until the next snapshot."""
+        with self.lock:
+            self.book = OrderBook()
+            self.sequence = -1
+            self.ready = False
+            self.updated = 0
+
+    def start(self):
+        """Connect on a background thread, return immediately."""
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Disconnect and stop reconnecting."""
+        self.running = False
+        ws = self.ws
+        if ws is not None:
+            # wake the reading thread rather than wait on a close reply it
+            # would read itself; it closes the socket on the way out
+            ws.abort()
+
+    def run(self):
+        backoff = 1
+        while self.running:
+            try:
+                self.ws = websocket.create_connection(
+                    self.url, timeout=self.stale_after)
+                backoff = 1
+
+                while self.running:
+                    self.on_message(self.ws.recv())
+
+            except Exception as ex:
+                if self.running:
+                    self.error = ex
+                    if util.debug:
+                        util.print_err(ex)
+
+            finally:
+                if self.ws is not None:
+                    self.ws.close()
+                self.reset()
+
+            if self.running:
+                self.reconnects += 1
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+    def on_message(self, message):
+        msg = json.loads(message)
+
+        with self.lock:
+            sequence = msg.get('socket_sequence')
+            if sequence is not None:
+                if sequence != self.sequence + 1:
+                    raise Exception('market data sequence gap')
+                self.sequence = sequence
+
+            for event in msg.get('events', []):
+                if event['type'] == 'change':
+                    self.book.update(event['side'], float(event['price']),
+                                     float(event['remaining']))
+                    if event.get('reason') == 'initial':
+                        self.ready = True
+                elif event['type'] == 'trade':
+                    self.last = float(event['price'])
+
+            self.updated = time.monotonic()
+
+        if self.listeners:
+            quote = self.get_quote()
+            for listener in self.listeners:
+                listener(quote)
+
+    def add_listener(self, listener):
+        """Call listener with the quote, or None, after every update."""
+        self.listeners.append(listener)
+
+    def is_live(self):
+        """Return True if the book is synced and the socket is not silent."""
+        return (self.ready and
+                time.monotonic() - self.updated < self.stale_after)
+
+    def set_last(self, last):
+        """Seed the last trade price until the feed reports a trade."""
+        with self.lock:
+            if self.last is None:
+                self.last = last
+
+    def get_quote(self):
+        """Return bid, ask, spread, last from memory, or None if not live."""
+        with self.lock:
+            if not self.is_live():
+                return None
+
+            bid = self.book.best_bid()
+            ask = self.book.best_ask()
+            last = self.last
+            if bid is None or ask is None or last is None:
+                return None
+
+            return Quote(bid, ask, last)
+
+    def get_book(self):
+        """Return a copy of the local book, or None if not live."""
+        with self.lock:
+            if not self.is_live():
+                return None
+
+            return self.book.copy()
+
+    def get_depth(self, side, price):
+        """Return the amount at price or better on a side, or None."""
+        with self.lock:
+            if not self.is_live():
+                return None
+
+            return self.book.depth(side, price)
+
+    def get_vwap(self, side, size):
+        """Return the average price and amount filled taking size, or None."""
+        with self.lock:
+            if not self.is_live():
+                return None
+
+            return self.book.vwap(side, size)
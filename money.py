@@ -0,0 +1,101 @@
+"""
+This module contains exact fixed-point arithmetic for BTC and USD amounts.
+
+BTC amounts are ints of satoshis, USD amounts are ints of micro-dollars and
+fee rates are ints of millionths. Values are parsed from their decimal strings
+without going through a float, each product is rounded once, and pro rata
+splits leave the remainder with the whole so splitting never drifts.
+"""
+from decimal import Decimal
+
+SATS = 100000000
+MICROS = 1000000
+PPM = 1000000
+
+
+def parse(val, scale):
+    """
+    Return a decimal value as an int count of 1/scale units.
+
+    Digits beyond the scale are rounded half away from zero.
+
+    Arguments:
+    val -- a decimal string, int or float
+    scale -- units per whole, a power of ten
+    """
+    if isinstance(val, int):
+        return val * scale
+
+    s = repr(val) if isinstance(val, float) else str(val).strip()
+    if 'e' in s or 'E' in s:
+        s = format(Decimal(s), 'f')
+
+    neg = s.startswith('-')
+    whole, _, frac = s.lstrip('+-').partition('.')
+
+    digits = len(str(scale)) - 1
+    n = int(whole or 0) * scale + int(frac[:digits].ljust(digits, '0'))
+    if frac[digits:digits + 1] >= '5':
+        n += 1
+
+    return -n if neg else n
+
+
+def to_sats(val):
+    """Return a BTC amount as satoshis."""
+    return parse(val, SATS)
+
+
+def to_micros(val):
+    """Return a USD amount as micro-dollars."""
+    return parse(val, MICROS)
+
+
+def to_ppm(val):
+    """Return a fractional rate, e.g. 0.001 for 0.1%, as millionths."""
+    return parse(val, PPM)
+
+
+def sats_to_btc(sats):
+    """Return satoshis as a float BTC amount for display."""
+    return sats / SATS
+
+
+def micros_to_usd(micros):
+    """Return micro-dollars as a float USD amount for display."""
+    return micros / MICROS
+
+
+def fmt_sats(sats):
+    """Return satoshis as an exact 8 decimal BTC string."""
+    sign = '-' if sats < 0 else ''
+    whole, frac = divmod(abs(sats), SATS)
+
+    return '{0}{1}.{2:08d}'.format(sign, whole, frac)
+
+
+def div_round(n, d):
+    """Return n / d rounded half away from zero, d must be positive."""
+    q, r = divmod(abs(n), d)
+    if r * 2 >= d:
+        q += 1
+
+    return -q if n < 0 else q
+
+
+def usd_value(price, sats):
+    """Return the micro-dollar value of sats at a micro-dollar price."""
+    return div_round(price * sats, SATS)
+
+
+def fee(micros, ppm):
+    """Return the micro-dollar fee on micros at a rate in millionths."""
+    return div_round(micros * ppm, PPM)
+
+
+def prorate(total, part, whole):
+    """Return the share of total owed to part out of whole."""
+    if part == whole:
+        return total
+
+    return div_round(total * part, whole)
@@ -0,0 +1,89 @@
+"""
+This module contains a client-side token bucket rate limiter.
+"""
+import heapq
+import itertools
+import threading
+import time
+
+PRIORITY_ORDER = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_BULK = 2
+
+
+class RateLimiter(object):
+    """
+    A token bucket that queues callers by priority instead of failing them.
+
+    Callers block in acquire() until a token is free. Waiters are served
+    lowest priority value first, then in arrival order, so order entry and
+    cancels go ahead of reporting reads and bulk history pulls fall behind.
+    """
+
+    def __init__(self, rate, burst):
+        """
+        Initialize the class.
+
+        Arguments:
+        rate -- tokens added per second
+        burst -- max tokens the bucket holds
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = time.monotonic()
+        self.cond = threading.Condition()
+        self.waiting = []
+        self.seq = itertools.count()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst,
+                          self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def acquire(self, priority=PRIORITY_DEFAULT):
+        """
+        Block until a token is granted to this caller.
+
+        Arguments:
+        priority -- PRIORITY_ORDER, PRIORITY_DEFAULT or PRIORITY_BULK
+        """
+        with self.cond:
+            ticket = (priority, next(self.seq))
+            heapq.heappush(self.waiting, ticket)
+
+            try:
+                while True:
+                    self.refill()
+                    if self.waiting[0] == ticket:
+                        if self.tokens >= 1:
+                            break
+                        self.cond.wait((1 - self.tokens) / self.rate)
+                    else:
+                        self.cond.wait()
+            except BaseException:
+                self.waiting.remove(ticket)
+                heapq.heapify(self.waiting)
+                self.cond.notify_all()
+                raise
+
+            heapq.heappop(self.waiting)
+            self.tokens -= 1
+            self.cond.notify_all()
+
+    def try_acquire(self):
+        """Take a token if one is free and no one is waiting, return True if taken."""
+        with self.cond:
+            self.refill()
+            if self.waiting or self.tokens < 1:
+                return False
+
+            self.tokens -= 1
+            return True
+
+    def penalize(self, seconds):
+        """Hold back all callers for seconds, e.g. after an HTTP 429."""
+        with self.cond:
+            self.refill()
+            self.tokens = min(self.tokens, 0) - seconds * self.rate
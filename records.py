@@ -0,0 +1,75 @@
+"""
+This module contains compact records for API responses.
+
+Each record converts its fields once, when the response is parsed, and uses
+__slots__ so rows carry no per-instance dict. Reports read the typed fields
+and format them in the views module, leaving the records unchanged.
+"""
+import money
+
+
+class Trade(object):
+    """
+    A /v1/mytrades fill.
+
+    Prices and fees are micro-dollars and amounts satoshis, see the money
+    module, parsed exactly from the decimal strings.
+    """
+
+    __slots__ = ("tid", "order_id", "timestamp", "timestampms", "type",
+                 "price", "amount", "fee_amount", "fee_currency", "aggressor")
+
+    def __init__(self, data):
+        """
+        Initialize the class.
+
+        Arguments:
+        data -- a /v1/mytrades trade or a trade store row
+        """
+        self.tid = int(data["tid"])
+        self.order_id = str(data["order_id"])
+        self.timestamp = int(data["timestamp"])
+        self.timestampms = int(data["timestampms"])
+        self.type = data["type"]
+        self.price = money.to_micros(data["price"])
+        self.amount = money.to_sats(data["amount"])
+        self.fee_amount = money.to_micros(data["fee_amount"])
+        self.fee_currency = data.get("fee_currency")
+        self.aggressor = bool(data.get("aggressor"))
+
+    def is_buy(self):
+        return self.type.lower() == "buy"
+
+
+class Balance(object):
+    """A /v1/balances currency balance."""
+
+    __slots__ = ("currency", "amount", "available", "available_for_withdrawal")
+
+    def __init__(self, data):
+        self.currency = data["currency"]
+        self.amount = float(data["amount"])
+        self.available = float(data["available"])
+        self.available_for_withdrawal = float(data.get("availableForWithdrawal", 0))
+
+
+class Quote(object):
+    """
+    Top of book and the last trade price.
+
+    A quote unpacks like the (bid, ask, spread, last) tuple it replaces.
+    """
+
+    __slots__ = ("bid", "ask", "spread", "last")
+
+    def __init__(self, bid, ask, last):
+        self.bid = bid
+        self.ask = ask
+        self.spread = ask - bid
+        self.last = last
+
+    def __iter__(self):
+        return iter((self.bid, self.ask, self.spread, self.last))
+
+    def __repr__(self):
+        return "Quote(bid={0}, ask={1}, last={2})".format(self.bid, self.ask, self.last)
@@ -0,0 +1,111 @@
+"""
+This module contains a local SQLite store of the account trade history.
+"""
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    tid INTEGER PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    order_id TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    timestampms INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    price TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    fee_amount TEXT NOT NULL,
+    fee_currency TEXT,
+    aggressor INTEGER
+);
+CREATE INDEX IF NOT EXISTS trades_symbol_timestampms ON trades (symbol, timestampms);
+CREATE INDEX IF NOT EXISTS trades_order_id ON trades (order_id);
+"""
+
+COLUMNS = ["tid", "symbol", "order_id", "timestamp", "timestampms", "type",
+           "price", "amount", "fee_amount", "fee_currency", "aggressor"]
+
+
+class TradeStore(object):
+    """
+    A local store of fills keyed by tid and indexed by time and order id.
+
+    Each sync only requests trades at or after the newest stored trade, so
+    reports read local rows instead of downloading the whole history again.
+    Prices and amounts are kept as the exact strings the API returned.
+    """
+
+    def __init__(self, path):
+        """
+        Initialize the class.
+
+        Arguments:
+        path -- the SQLite database file
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        """Close the database."""
+        with self.lock:
+            self.db.close()
+
+    def get_high_water_mark(self, symbol):
+        """Return the timestampms of the newest stored trade, or 0."""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT MAX(timestampms) FROM trades WHERE symbol = ?",
+                (symbol,)).fetchone()
+
+        return row[0] or 0
+
+    def sync(self, trades, symbol):
+        """
+        Insert new trades, skip ones already stored, return the count added.
+
+        Arguments:
+        trades -- an iterable of /v1/mytrades trades, e.g. a paging iterator
+        symbol -- the currency symbol the trades belong to
+        """
+        sql = "INSERT OR IGNORE INTO trades ({0}) VALUES ({1})".format(
+            ", ".join(COLUMNS), ", ".join("?" * len(COLUMNS)))
+
+        added = 0
+        with self.lock:
+            with self.db:
+                for t in trades:
+                    cur = self.db.execute(sql, (
+                        t["tid"], symbol, str(t["order_id"]), t["timestamp"],
+                        t["timestampms"], t["type"], str(t["price"]),
+                        str(t["amount"]), str(t["fee_amount"]),
+                        t.get("fee_currency"), t.get("aggressor")))
+                    added += cur.rowcount
+
+        return added
+
+    def get_trades(self, symbol, since=0):
+        """
+        Return stored trades as /v1/mytrades dicts, oldest first.
+
+        Arguments:
+        symbol -- currency symbol
+        since -- only return trades at or after this timestampms (default 0)
+        """
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT * FROM trades WHERE symbol = ? AND timestampms >= ? "
+                "ORDER BY timestampms, tid", (symbol, since)).fetchall()
+
+        return [dict(row) for row in rows]
+
+    def get_order_trades(self, order_id):
+        """Return the stored fills of an order, oldest first."""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT * FROM trades WHERE order_id = ? "
+                "ORDER BY timestampms, tid", (str(order_id),)).fetchall()
+
+        return [dict(row) for row in rows]
@@ -0,0 +1,71 @@
+"""
+This module contains a columnar table of trades for fast reductions.
+"""
+from array import array
+from itertools import compress
+import money
+
+
+class TradeTable(object):
+    """
+    Trades parsed once into typed array columns.
+
+    Prices, values and fees are micro-dollars, amounts are satoshis and
+    timestamps are seconds, each held in a contiguous int64 array. Sums run
+    in C over the arrays, or over a side mask with itertools.compress, so
+    statistics never touch the source dicts or build per-row objects.
+    """
+
+    def __init__(self, trades):
+        """
+        Initialize the class.
+
+        Arguments:
+        trades -- an iterable of records.Trade, in any order
+        """
+        self.price = array('q')
+        self.amount = array('q')
+        self.value = array('q')
+        self.fee = array('q')
+        self.timestamp = array('q')
+        self.buy = array('b')
+        self.sell = array('b')
+        self.side = []
+        self.order_id = []
+
+        for t in trades:
+            is_buy = t.is_buy()
+
+            self.price.append(t.price)
+            self.amount.append(t.amount)
+            self.value.append(money.usd_value(t.price, t.amount))
+            self.fee.append(t.fee_amount)
+            self.timestamp.append(t.timestamp)
+            self.buy.append(is_buy)
+            self.sell.append(not is_buy)
+            self.side.append(t.type)
+            self.order_id.append(t.order_id)
+
+    def __len__(self):
+        return len(self.price)
+
+    def total(self, column, mask=None):
+        """
+        Return the sum of a column, optionally only rows where mask is set.
+
+        Arguments:
+        column -- the column array, e.g. table.fee
+        mask -- a row mask array, e.g. table.buy (default None)
+        """
+        if mask is None:
+            return sum(column)
+
+        return sum(compress(column, mask))
+
+    def basis(self, mask=None):
+        """Return the micro-dollar value plus fees of the rows."""
+        return self.total(self.value, mask) + self.total(self.fee, mask)
+
+    def proceeds(self, mask=None):
+        """Return the micro-dollar value less fees of the rows."""
+        return self.total(self.value, mask) - self.total(self.fee, mask)
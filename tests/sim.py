@@ -0,0 +1,130 @@
+"""
+This module contains an in-memory exchange to step schedules against.
+
+SimExchange answers the Geminipy calls that order entry and execution
+schedules make, with responses shaped like the API's. Orders rest until a
+test fills or cancels them.
+"""
+import itertools
+import time
+import money
+
+
+class Crash(BaseException):
+    """A process dying mid-request, which no retry or handler catches."""
+
+
+class Response(object):
+    """A requests.Response stand-in holding a decoded JSON body."""
+
+    def __init__(self, data, status_code=200):
+        self.data = data
+        self.status_code = status_code
+
+    def json(self, **kwargs):
+        return self.data
+
+
+class SimExchange(object):
+    """
+    An exchange with one btcusd book and no matching engine.
+
+    Arguments:
+    bid -- the ticker bid (default 9999.99)
+    ask -- the ticker ask (default 10000.0)
+    """
+
+    instances = itertools.count()
+
+    def __init__(self, bid=9999.99, ask=10000.0):
+        # quotes and fees are cached by host and key, so each exchange gets its own
+        self.base_url = 'sim://{0}'.format(next(self.instances))
+        self.api_key = 'sim'
+        self.bid = bid
+        self.ask = ask
+        self.orders = {}
+        self.ids = itertools.count(1)
+
+        # cancel maker-or-cancel orders on entry, as at a crossing price
+        self.auto_cancel = False
+
+        # raise Crash on the next order entry, before or after taking the order
+        self.crash_before_order = False
+        self.crash_after_order = False
+
+    def fill(self, order_id, amount=None):
+        """Execute amount BTC of a live order at its price, all of it by default."""
+        order = self.orders[int(order_id)]
+        remaining = money.to_sats(order["remaining_amount"])
+        sats = remaining if amount is None else money.to_sats(amount)
+
+        executed = money.to_sats(order["executed_amount"]) + sats
+        order["executed_amount"] = money.fmt_sats(executed)
+        order["remaining_amount"] = money.fmt_sats(remaining - sats)
+        order["avg_execution_price"] = order["price"]
+        order["is_live"] = remaining - sats > 0
+
+    def get_live_orders(self):
+        return [o for o in self.orders.values() if o["is_live"]]
+
+    def pubticker(self, symbol='btcusd'):
+        return Response({"bid": str(self.bid), "ask": str(self.ask),
+                         "last": str((self.bid + self.ask) / 2)})
+
+    def fees(self):
+        return Response({"api_maker_fee_bps": 10, "api_taker_fee_bps": 35,
+                         "web_maker_fee_bps": 100, "web_taker_fee_bps": 100})
+
+    def new_order(self, amount, price, side, client_order_id=None,
+                  symbol='btcusd', type='exchange limit', options=None):
+        if self.crash_before_order:
+            self.crash_before_order = False
+            raise Crash()
+
+        order_id = next(self.ids)
+        cancelled = self.auto_cancel and 'maker-or-cancel' in (options or [])
+        now = time.time()
+        self.orders[order_id] = {
+            "order_id": str(order_id),
+            "client_order_id": client_order_id,
+            "symbol": symbol,
+            "side": side,
+            "type": type,
+            "price": str(price),
+            "avg_execution_price": "0.00",
+            "original_amount": str(amount),
+            "executed_amount": "0",
+            "remaining_amount": str(amount),
+            "timestamp": str(int(now)),
+            "timestampms": int(now * 1000),
+            "is_live": not cancelled,
+            "is_cancelled": cancelled,
+        }
+
+        if self.crash_after_order:
+            self.crash_after_order = False
+            raise Crash()
+
+        return Response(dict(self.orders[order_id]))
+
+    def order_status(self, order_id=None, client_order_id=None):
+        if order_id is not None:
+            order = self.orders.get(int(order_id))
+        else:
+            order = next((o for o in self.orders.values()
+                          if o["client_order_id"] == client_order_id), None)
+
+        if order is None:
+            return Response({"result": "error", "reason": "OrderNotFound"}, 400)
+
+        return Response(dict(order))
+
+    def cancel_order(self, order_id):
+        order = self.orders.get(int(order_id))
+        if order is None or not order["is_live"]:
+            return Response({"result": "error", "reason": "OrderNotFound"}, 400)
+
+        order["is_live"] = False
+        order["is_cancelled"] = True
+
+        return Response(dict(order))
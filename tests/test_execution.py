@@ -0,0 +1,148 @@
+import os
+import shutil
+import tempfile
+import unittest
+import execution
+import gemini
+import money
+from sim import SimExchange, Crash
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ScheduleTest(unittest.TestCase):
+    def setUp(self):
+        self.ex = SimExchange()
+        self.clock = Clock()
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'execution.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def new_twap(self, **kwargs):
+        return execution.new_twap(self.ex, gemini.SIDE_BUY, 9000, 1.0, 4, 60,
+                                  reserve_api_fees=gemini.RESERVE_FEE_NONE,
+                                  path=self.path, clock=self.clock, **kwargs)
+
+    def new_iceberg(self, **kwargs):
+        return execution.new_iceberg(self.ex, gemini.SIDE_BUY, 9000, 1.0, 0.3,
+                                     reserve_api_fees=gemini.RESERVE_FEE_NONE,
+                                     path=self.path, clock=self.clock, **kwargs)
+
+    def child_amounts(self):
+        return [o["original_amount"] for o in self.ex.orders.values()]
+
+    def test_twap_fills_in_slices(self):
+        schedule = self.new_twap()
+
+        while schedule.step():
+            for o in self.ex.get_live_orders():
+                self.ex.fill(o["order_id"])
+            self.clock.now += 15
+
+        self.assertEqual(schedule.get_status(), execution.STATUS_DONE)
+        self.assertEqual(self.child_amounts(), ["0.25000000"] * 4)
+        self.assertEqual(schedule.get_executed(), money.to_sats(1.0))
+
+    def test_twap_respreads_unfilled_rest(self):
+        schedule = self.new_twap()
+
+        schedule.step()
+        self.ex.fill(1, 0.1)
+        self.clock.now += 15
+        schedule.step()
+
+        # the first child is cancelled with 0.15 unfilled, 0.9 is left over 3 slices
+        self.assertTrue(self.ex.orders[1]["is_cancelled"])
+        self.assertEqual(self.child_amounts(), ["0.25000000", "0.30000000"])
+
+    def test_iceberg_shows_visible_size(self):
+        schedule = self.new_iceberg()
+
+        while schedule.step():
+            live = self.ex.get_live_orders()
+            self.assertEqual(len(live), 1)
+            self.ex.fill(live[0]["order_id"])
+
+        self.assertEqual(schedule.get_status(), execution.STATUS_DONE)
+        self.assertEqual(self.child_amounts(),
+                         ["0.30000000", "0.30000000", "0.30000000", "0.10000000"])
+
+    def test_resume_picks_up_live_child(self):
+        schedule = self.new_iceberg()
+        schedule.step()
+        self.ex.fill(1, 0.1)
+
+        resumed = execution.load_schedule(self.ex, self.path, clock=self.clock)
+        self.assertEqual(resumed.live.get_order_id(), 1)
+
+        resumed.step()
+        self.assertEqual(len(self.ex.orders), 1)
+        self.assertEqual(resumed.get_executed(), money.to_sats(0.1))
+
+        while resumed.step():
+            for o in self.ex.get_live_orders():
+                self.ex.fill(o["order_id"])
+
+        self.assertEqual(resumed.get_executed(), money.to_sats(1.0))
+
+    def test_resume_after_crash_mid_submit_finds_child(self):
+        schedule = self.new_iceberg()
+        self.ex.crash_after_order = True
+        with self.assertRaises(Crash):
+            schedule.step()
+
+        resumed = execution.load_schedule(self.ex, self.path, clock=self.clock)
+        resumed.step()
+
+        # the order that went out is the live child, nothing was sent twice
+        self.assertEqual(len(self.ex.orders), 1)
+        self.assertEqual(resumed.live.get_order_id(), 1)
+        self.assertEqual(resumed.state["children"][0]["order_id"], 1)
+
+    def test_resume_after_crash_before_submit_sends_child(self):
+        schedule = self.new_iceberg()
+        self.ex.crash_before_order = True
+        with self.assertRaises(Crash):
+            schedule.step()
+
+        resumed = execution.load_schedule(self.ex, self.path, clock=self.clock)
+        self.assertEqual(resumed.state["children"], [])
+
+        resumed.step()
+        self.assertEqual(len(self.ex.orders), 1)
+        self.assertEqual(len(resumed.state["children"]), 1)
+
+    def test_unfilled_children_stop_iceberg(self):
+        self.ex.auto_cancel = True
+        schedule = self.new_iceberg(maker_or_cancel=True)
+
+        steps = 0
+        while schedule.step() and steps < 50:
+            steps += 1
+
+        self.assertEqual(schedule.get_status(), execution.STATUS_FAILED)
+        self.assertEqual(len(self.ex.orders), execution.MAX_UNFILLED_CHILDREN)
+
+    def test_unfilled_children_stop_twap(self):
+        self.ex.auto_cancel = True
+        schedule = self.new_twap(maker_or_cancel=True)
+
+        steps = 0
+        while schedule.step() and steps < 50:
+            self.clock.now += 15
+            steps += 1
+
+        self.assertEqual(schedule.get_status(), execution.STATUS_FAILED)
+        self.assertEqual(len(self.ex.orders), execution.MAX_UNFILLED_CHILDREN)
+
+
+if __name__ == '__main__':
+    unittest.main()
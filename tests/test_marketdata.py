@@ -0,0 +1,72 @@
+import time
+import unittest
+from marketdata import MarketData
+from wsserver import MarketDataServer, snapshot
+
+
+def wait_for(condition, timeout=5.0):
+    """Return the first truthy value of condition(), or None after timeout."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        value = condition()
+        if value:
+            return value
+        time.sleep(0.01)
+
+    return None
+
+
+def trade(sequence, price):
+    return {"type": "update", "socket_sequence": sequence,
+            "events": [{"type": "trade", "price": str(price), "amount": "0.1",
+                        "makerSide": "bid"}]}
+
+
+class MarketDataTest(unittest.TestCase):
+    def start(self, scripts):
+        self.server = MarketDataServer(scripts)
+        self.feed = MarketData(url=self.server.url)
+        self.feed.start()
+
+    def tearDown(self):
+        self.feed.stop()
+        self.server.close()
+
+    def test_book_from_snapshot_and_updates(self):
+        self.start([[
+            snapshot(0, bids=[100, 99], asks=[101, 102]),
+            {"type": "update", "socket_sequence": 1,
+             "events": [{"type": "change", "reason": "cancel", "side": "ask",
+                         "price": "101", "remaining": "0", "delta": "-1"}]},
+            trade(2, 100.5),
+        ]])
+
+        quote = wait_for(lambda: self.feed.get_quote() if self.feed.sequence == 2 else None)
+        self.assertIsNotNone(quote)
+        self.assertEqual((quote.bid, quote.ask, quote.last), (100.0, 102.0, 100.5))
+
+    def test_resync_on_sequence_gap(self):
+        self.start([
+            [snapshot(0, bids=[100], asks=[101]), trade(1, 100.5),
+             {"type": "heartbeat", "socket_sequence": 5}],
+            [snapshot(0, bids=[200], asks=[201]), trade(1, 200.5)],
+        ])
+
+        # the gap drops the first book, the second connection rebuilds it
+        quote = wait_for(lambda: self.feed.get_quote() if self.server.connections == 2 else None)
+        self.assertIsNotNone(quote)
+        self.assertEqual(self.feed.reconnects, 1)
+        self.assertEqual(str(self.feed.error), 'market data sequence gap')
+        self.assertEqual((quote.bid, quote.ask, quote.last), (200.0, 201.0, 200.5))
+        self.assertEqual(self.feed.get_book().best_bid(), 200.0)
+
+    def test_silent_feed_is_not_live(self):
+        self.start([[snapshot(0, bids=[100], asks=[101]), trade(1, 100.5)]])
+        self.feed.stale_after = 0.2
+
+        self.assertIsNotNone(wait_for(self.feed.get_quote))
+        self.assertTrue(wait_for(lambda: self.feed.get_quote() is None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+This module contains a stand-in market data WebSocket server.
+
+Each connection is sent the next scripted list of messages, then held open
+until the client or the server closes it. Only what the feed uses of the
+protocol is spoken: the upgrade handshake, unmasked text frames and the
+closing handshake.
+"""
+import base64
+import hashlib
+import json
+import socket
+import struct
+import threading
+
+GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+
+def snapshot(sequence, bids, asks):
+    """Return an initial book update with the given bid and ask prices."""
+    events = [{"type": "change", "reason": "initial", "side": "bid",
+               "price": str(p), "remaining": "1", "delta": "1"} for p in bids]
+    events += [{"type": "change", "reason": "initial", "side": "ask",
+                "price": str(p), "remaining": "1", "delta": "1"} for p in asks]
+
+    return {"type": "update", "socket_sequence": sequence, "events": events}
+
+
+def frame(text):
+    data = text.encode()
+    if len(data) < 126:
+        header = struct.pack('!BB', 0x81, len(data))
+    elif len(data) < 65536:
+        header = struct.pack('!BBH', 0x81, 126, len(data))
+    else:
+        header = struct.pack('!BBQ', 0x81, 127, len(data))
+
+    return header + data
+
+
+class MarketDataServer(object):
+    """
+    A local server playing one script per connection.
+
+    Arguments:
+    scripts -- a list of message lists, the nth for the nth connection
+    """
+
+    def __init__(self, scripts):
+        self.scripts = list(scripts)
+        self.connections = 0
+        self.clients = []
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(5)
+        self.url = 'ws://127.0.0.1:{0}/'.format(self.sock.getsockname()[1])
+
+        thread = threading.Thread(target=self.serve, daemon=True)
+        thread.start()
+
+    def serve(self):
+        while True:
+            try:
+                client, address = self.sock.accept()
+            except OSError:
+                return
+
+            self.clients.append(client)
+            script = self.scripts[self.connections] if self.connections < len(self.scripts) else []
+            self.connections += 1
+            threading.Thread(target=self.play, args=(client, script),
+                             daemon=True).start()
+
+    def play(self, client, script):
+        try:
+            request = b''
+            while b'\r\n\r\n' not in request:
+                request += client.recv(4096)
+
+            key = [line.split(b':', 1)[1].strip() for line in request.split(b'\r\n')
+                   if line.lower().startswith(b'sec-websocket-key:')][0]
+            accept = base64.b64encode(hashlib.sha1(key + GUID.encode()).digest())
+            client.sendall(b'HTTP/1.1 101 Switching Protocols\r\n'
+                           b'Upgrade: websocket\r\nConnection: Upgrade\r\n'
+                           b'Sec-WebSocket-Accept: ' + accept + b'\r\n\r\n')
+
+            for message in script:
+                client.sendall(frame(json.dumps(message)))
+
+            # hold the connection until the client closes it
+            while self.read_frame(client) != 0x8:
+                pass
+
+            client.sendall(struct.pack('!BB', 0x88, 0))
+        except OSError:
+            pass
+
+    def read_frame(self, client):
+        """Read a masked client frame, return its opcode."""
+        first, second = struct.unpack('!BB', self.read(client, 2))
+        length = second & 0x7f
+        if length == 126:
+            length = struct.unpack('!H', self.read(client, 2))[0]
+        elif length == 127:
+            length = struct.unpack('!Q', self.read(client, 8))[0]
+
+        self.read(client, 4 + length)
+
+        return first & 0x0f
+
+    def read(self, client, n):
+        data = b''
+        while len(data) < n:
+            chunk = client.recv(n - len(data))
+            if not chunk:
+                raise OSError('connection closed')
+            data += chunk
+
+        return data
+
+    def close(self):
+        self.sock.close()
+        for client in self.clients:
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            client.close()
@@ -0,0 +1,232 @@
+"""
+This module contains client-side conditional orders fired by price moves.
+
+A trigger holds an exchange limit order back until a reference price (bid,
+ask or last) rises to or above, or falls to or below, a level, e.g. sell 0.5
+BTC at 95 if the bid drops below 96.
+"""
+import itertools
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+import gemini
+
+PRICE_BID = "bid"
+PRICE_ASK = "ask"
+PRICE_LAST = "last"
+
+PRICES = [PRICE_BID, PRICE_ASK, PRICE_LAST]
+
+DIRECTION_ABOVE = "above"
+DIRECTION_BELOW = "below"
+
+DIRECTIONS = [DIRECTION_ABOVE, DIRECTION_BELOW]
+
+STATE_PENDING = "pending"
+STATE_FIRED = "fired"
+STATE_FAILED = "failed"
+STATE_CANCELLED = "cancelled"
+
+
+class Trigger(object):
+    """An order to submit once a reference price crosses a level."""
+
+    def __init__(self, ref, direction, level, side, price, quantity,
+                 unit=gemini.UNIT_BTC, maker_or_cancel=False,
+                 reserve_api_fees=gemini.RESERVE_FEE_ACTUAL):
+        """
+        Initialize the class.
+
+        Arguments:
+        ref -- the price watched, PRICE_BID, PRICE_ASK or PRICE_LAST
+        direction -- fire at or above the level, or at or below it
+        level -- the trigger price
+        side -- gemini.SIDE_BUY or gemini.SIDE_SELL
+        price -- the limit price of the order
+        quantity -- the order quantity
+        unit -- the quantity unit (default gemini.UNIT_BTC)
+        maker_or_cancel -- send the order as maker-or-cancel (default False)
+        reserve_api_fees -- the fee reserve of the order (default actual)
+        """
+        if ref not in PRICES:
+            raise Exception("Price {0} not in {1}".format(ref, PRICES))
+
+        if direction not in DIRECTIONS:
+            raise Exception("Direction {0} not in {1}".format(direction, DIRECTIONS))
+
+        self.id = None
+        self.ref = ref
+        self.direction = direction
+        self.level = float(level)
+        self.side = side
+        self.price = float(price)
+        self.quantity = float(quantity)
+        self.unit = unit
+        self.maker_or_cancel = maker_or_cancel
+        self.reserve_api_fees = reserve_api_fees
+
+        self.state = STATE_PENDING
+        self.fired_price = None
+        self.order = None
+        self.error = None
+
+    def key(self):
+        return (self.level, self.id)
+
+
+class TriggerEngine(object):
+    """
+    Pending triggers indexed by level for each watched price and direction.
+
+    Each index is a list of (level, id) keys kept sorted by bisect. A quote
+    at price p fires the "below" triggers with a level of p or more, a suffix
+    of the list, and the "above" triggers with a level of p or less, a
+    prefix. Finding them is a binary search, so a quote costs O(log n) plus
+    the triggers that fire, however many are pending.
+
+    Fired orders are prepared against the quote that fired them and
+    submitted on a thread pool, so a slow order never holds up the quotes
+    feeding the engine.
+
+    Quotes come from a market data feed when there is one. While the feed is
+    down, or without one, the REST ticker is polled instead. Polling only
+    runs while triggers are pending, so an idle engine sends no requests.
+    """
+
+    def __init__(self, con, workers=4, feed=None, interval=1.0):
+        """
+        Initialize the class.
+
+        Arguments:
+        con -- a Geminipy connection
+        workers -- the max orders submitted at once (default 4)
+        feed -- a marketdata.MarketData to take quotes from (default None)
+        interval -- seconds between ticker polls (default 1.0)
+        """
+        self.con = con
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.triggers = {}
+        self.index = dict(((ref, direction), [])
+                          for ref in PRICES for direction in DIRECTIONS)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.feed = feed
+        self.interval = interval
+        self.polling = False
+        self.poll_error = None
+
+        if feed is not None:
+            feed.add_listener(self.on_quote)
+
+    def add(self, trigger):
+        """Add a pending trigger, return its id."""
+        with self.lock:
+            trigger.id = next(self.ids)
+            self.triggers[trigger.id] = trigger
+
+            keys = self.index[(trigger.ref, trigger.direction)]
+            keys.insert(bisect_left(keys, trigger.key()), trigger.key())
+
+        self.start_polling()
+
+        return trigger.id
+
+    def cancel(self, trigger_id):
+        """Cancel a pending trigger, return False if it is not pending."""
+        with self.lock:
+            trigger = self.triggers.get(trigger_id)
+            if trigger is None or trigger.state != STATE_PENDING:
+                return False
+
+            keys = self.index[(trigger.ref, trigger.direction)]
+            del keys[bisect_left(keys, trigger.key())]
+            trigger.state = STATE_CANCELLED
+
+            return True
+
+    def get_triggers(self):
+        """Return every trigger in the order they were added."""
+        with self.lock:
+            return [self.triggers[i] for i in sorted(self.triggers)]
+
+    def on_quote(self, quote):
+        """
+        Fire the triggers a quote crosses.
+
+        Arguments:
+        quote -- a bid, ask, spread, last tuple, e.g. from gemini.get_quote()
+        """
+        if quote is None:
+            return
+
+        bid, ask, spread, last = quote
+        prices = {PRICE_BID: bid, PRICE_ASK: ask, PRICE_LAST: last}
+
+        fired = []
+        with self.lock:
+            for ref, price in prices.items():
+                below = self.index[(ref, DIRECTION_BELOW)]
+                i = bisect_left(below, (price,))
+                fired.extend(below[i:])
+                del below[i:]
+
+                above = self.index[(ref, DIRECTION_ABOVE)]
+                i = bisect_right(above, (price, float('inf')))
+                fired.extend(above[:i])
+                del above[:i]
+
+            fired = [self.triggers[trigger_id] for level, trigger_id in fired]
+            for trigger in fired:
+                trigger.state = STATE_FIRED
+                trigger.fired_price = prices[trigger.ref]
+
+        for trigger in fired:
+            self.executor.submit(self.submit, trigger, quote)
+
+    def submit(self, trigger, quote):
+        try:
+            o = gemini.new_order(self.con, trigger.side, trigger.price,
+                                 trigger.quantity, trigger.unit)
+            o.set_maker_or_cancel(trigger.maker_or_cancel)
+            o.set_reserve_api_fees(trigger.reserve_api_fees)
+            o.prepare(quote=quote)
+            o.execute()
+            trigger.order = o
+
+        except Exception as ex:
+            trigger.state = STATE_FAILED
+            trigger.error = ex
+
+    def is_pending(self):
+        return any(self.index.values())
+
+    def start_polling(self):
+        """Poll on a background thread until no trigger is pending."""
+        with self.lock:
+            if self.polling:
+                return
+            self.polling = True
+
+        thread = threading.Thread(target=self.poll, daemon=True)
+        thread.start()
+
+    def stop_polling(self):
+        self.polling = False
+
+    def poll(self):
+        while True:
+            with self.lock:
+                if not self.polling or not self.is_pending():
+                    self.polling = False
+                    return
+
+            # a live feed pushes its own quotes, the ticker covers for it
+            if self.feed is None or self.feed.get_quote() is None:
+                try:
+                    self.on_quote(gemini.get_quote(self.con, max_age=gemini.QUOTE_MAX_AGE_FRESH))
+                    self.poll_error = None
+                except Exception as ex:
+                    self.poll_error = ex
+
+            time.sleep(self.interval)
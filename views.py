@@ -0,0 +1,92 @@
+"""
+This module contains the formatting of records into display rows.
+
+Rows are built fresh for each report, so the records they are built from are
+never overwritten with formatted strings.
+"""
+from datetime import datetime
+import money
+import util
+
+ORDER_HEADERS = ["date", "side", "total", "type", "price", "original_amount", "symbol", "executed_amount", "avg_execution_price", "remaining_amount", "is_live", "is_cancelled", "order_id"]
+
+
+def order_row(o):
+    """Return a gemini.OrderStatus as a row of ORDER_HEADERS."""
+    return [
+        util.fmt_date(o.get_timestamp()),
+        o.get_side(),
+        util.fmt_usd(o.get_total()),
+        o.get_type(),
+        util.fmt_usd(o.get_price()),
+        util.fmt_btc(o.get_original_amount()),
+        o.get_symbol(),
+        util.fmt_btc(o.get_executed_amount()),
+        util.fmt_usd(o.get_avg_execution_price()),
+        util.fmt_btc(o.get_remaining_amount()),
+        o.is_live(),
+        o.is_cancelled(),
+        o.get_order_id(),
+    ]
+
+
+def closed_lot_row(z):
+    """Return a lots.ClosedLot as a dict of formatted columns."""
+    return {
+        'amount': money.fmt_sats(z.amount),
+        'buy_date': util.fmt_date(z.buy_date),
+        'sell_date': util.fmt_date(z.sell_date),
+        'proceeds': util.fmt_usd(money.micros_to_usd(z.proceeds)),
+        'basis': util.fmt_usd(money.micros_to_usd(z.basis)),
+        'gain': util.fmt_usd(money.micros_to_usd(z.gain)),
+        'gain_pct': util.fmt_pct(z.gain_pct),
+        'buy_fees': util.fmt_usd(money.micros_to_usd(z.buy_fees)),
+        'sell_fees': util.fmt_usd(money.micros_to_usd(z.sell_fees)),
+        'total_fees': util.fmt_usd(money.micros_to_usd(z.total_fees)),
+        'buy_order_id': z.buy_order_id,
+        'sell_order_id': z.sell_order_id,
+    }
+
+
+def open_lot_row(o, symbol, last):
+    """Return a lots.OpenLot valued at the last price as formatted columns."""
+    current = money.usd_value(money.to_micros(last), o.amount)
+    gain = current - o.basis
+    gain_pct = gain / o.basis * 100 if o.basis else 0.0
+
+    return {
+        'date': util.fmt_date(o.date),
+        'type': "Buy",
+        'price': util.fmt_usd(money.micros_to_usd(o.price)),
+        'amount': money.fmt_sats(o.amount),
+        'basis': util.fmt_usd(money.micros_to_usd(o.basis)),
+        'current': util.fmt_usd(money.micros_to_usd(current)),
+        'gain': util.fmt_usd(money.micros_to_usd(gain)),
+        'gain_pct': util.fmt_pct(gain_pct),
+        'symbol': symbol,
+        'fee_amount': util.fmt_usd(money.micros_to_usd(o.fees)),
+        'order_id': o.order_id,
+    }
+
+
+def history_rows(trades, symbol):
+    """Return the rows of a table.TradeTable as dicts of formatted columns."""
+    rows = []
+    for i in range(len(trades)):
+        if trades.buy[i]:
+            basis_proceeds = trades.value[i] + trades.fee[i]
+        else:
+            basis_proceeds = trades.value[i] - trades.fee[i]
+
+        rows.append({
+            'date': util.fmt_date(datetime.fromtimestamp(trades.timestamp[i])),
+            'type': trades.side[i],
+            'price': util.fmt_usd(money.micros_to_usd(trades.price[i])),
+            'amount': money.fmt_sats(trades.amount[i]),
+            'basis/proceeds': money.micros_to_usd(basis_proceeds),
+            'symbol': symbol,
+            'fee_amount': util.fmt_usd(money.micros_to_usd(trades.fee[i])),
+            'order_id': trades.order_id[i],
+        })
+
+    return rows